@@ -3,27 +3,236 @@ Python wrapper for Santec Lazers
 Author(s): Howard Dao
 """
 
-import pyvisa as visa
-import numpy as np
+import atexit
+import queue
+import threading
+import weakref
+
+# Lasers not yet closed; their queued writes are sent when the interpreter exits
+_OPEN = weakref.WeakSet()
+
+@atexit.register
+def _close_open_lasers():
+    for laser in list(_OPEN):
+        laser.close()
+
+class TSL710:
+    min_wl = 1480
+    max_wl = 1640
+    min_spd = 0.5
+    max_spd = 100
+    min_del = 0
+    max_del = 999.9
+    min_pow_mW = 0.1
+    max_pow_mW = 10
+    min_pow_dBm = -20
+    max_pow_dBm = 10
+
+    _BOUNDS = {
+        'wl': (min_wl, max_wl),
+        'spd': (min_spd, max_spd),
+        'del': (min_del, max_del),
+        'cycl': (0, 999),
+        'mod': (0, 3),
+        'mW': (min_pow_mW, max_pow_mW),
+        'dBm': (min_pow_dBm, max_pow_dBm),
+    }
+
+    _POW_UNITS = ('dBm', 'mW')
+    _POW_UNIT_NUMS = {'dBm': 0, 'mW': 1}
+    _TRIG_OUTS = ('none', 'stop', 'start', 'step')
+    _TRIG_OUT_NUMS = {'none': 0, 'stop': 1, 'start': 2, 'step': 3}
+
+    # Getter name -> (query, reply type), used by prefetch()
+    _QUERIES = {
+        'get_wavelength': (':wav?', float),
+        'get_wav_sweep_start': (':wav:swe:start?', float),
+        'get_wav_sweep_stop': (':wav:swe:stop?', float),
+        'get_wave_sweep_speed': (':wav:swe:spe?', float),
+        'get_wave_sweep_delay': (':wav:swe:del?', float),
+        'get_wave_sweep_cycles': (':wav:swe:cycl?', int),
+        'get_wave_sweep_mode': (':wav:swe:mod?', int),
+        'get_power': (':pow?', float),
+    }
+
+    # Pre-encoded command prefixes for the setters, written with write_raw
+    _WAV = b':wav '
+    _WAV_START = b':wav:swe:start '
+    _WAV_STOP = b':wav:swe:stop '
+    _WAV_SPEED = b':wav:swe:spe '
+    _WAV_DELAY = b':wav:swe:del '
+    _WAV_CYCLES = b':wav:swe:cycl '
+    _WAV_MODE = b':wav:swe:mod '
+    _POW_UNIT = b':pow:unit '
+    _POW = b':pow '
+    _TRIG_OUT = b':trig:outp '
+    _SWEEP_ON = b':wav:swe:stat 1'
+    _CLEAR_STATUS = b'*CLS'
+    _TERM = b'\n'
+
+    # Limits and command prefixes live on the class, so instances only carry state
+    __slots__ = ('idn', 'visa', '_last', '_sweeps', '_cmd_q', '_write_error', '_writer', '__weakref__')
 
-class TSL710(visa.resources.GPIBInstrument):
     def __init__(self, visa):
-        self.idn = visa.query('*IDN?')
-        self.idn = self.idn.split(',')
-        if self.idn[0] != 'Santec' or self.idn[1] != 'TSL-710':
-            print('Device not recognized as Santec TSL-710.')
+        visa.read_termination = '\n'
+        visa.write_termination = '\n'
+        visa.send_end = True
+        visa.chunk_size = 20 * 1024
+        visa.timeout = 5000
+
+        self.idn = visa.query('*IDN?').strip()
+        idn = self.idn.upper()
+        if 'SANTEC' not in idn or 'TSL-710' not in idn:
+            raise RuntimeError(f'Device not recognized as Santec TSL-710: "{self.idn}".')
         self.visa = visa
 
-        self.min_wl = 1480
-        self.max_wl = 1640
-        self.min_spd = 0.5
-        self.max_spd = 100
-        self.min_del = 0
-        self.max_del = 999.9
-        self.min_pow_mW = 0.1
-        self.max_pow_mW = 10
-        self.min_pow_dBm = -20
-        self.max_pow_dBm = 10
+        # Last argument written for each command prefix, used to skip
+        # writes that would not change the laser's state.
+        self._last = {}
+
+        # Validated and encoded sweep settings saved by define_sweep()
+        self._sweeps = {}
+
+        # Writes are handed to a background thread so that setters return
+        # as soon as their input is validated. close() writes whatever is
+        # still queued and stops the thread; it also runs at interpreter exit
+        # for lasers that were never closed.
+        self._cmd_q = queue.Queue()
+        self._write_error = None
+        self._writer = threading.Thread(target=self._write_worker, daemon=True)
+        self._writer.start()
+        _OPEN.add(self)
+
+        # Request service when the sweeping bit of the operation status
+        # register clears, so wait_for_sweep_complete() need not poll. Only
+        # the negative transition (sweep ended) is latched as an event.
+        self._write(b':stat:oper:ptr 0;:stat:oper:ntr 8;:stat:oper:enab 8;*SRE 128')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """
+        Writes any queued commands, stops the writer thread and closes the
+        session.
+
+        Raises:
+            Exception: The first error raised by a queued write, if any.
+        """
+        _OPEN.discard(self)
+        try:
+            self.flush()
+        finally:
+            if self._writer.is_alive():
+                self._cmd_q.put(None)
+                self._writer.join()
+            self.visa.close()
+
+    def _write_worker(self):
+        while True:
+            cmd = self._cmd_q.get()
+            if cmd is None:
+                # Sentinel queued by close()
+                self._cmd_q.task_done()
+                return
+            try:
+                self.visa.write_raw(cmd + self._TERM)
+            except Exception as err:
+                # Keep the first failure; later ones usually follow from it
+                if self._write_error is None:
+                    self._write_error = err
+                self._last.clear()
+            finally:
+                self._cmd_q.task_done()
+
+    def _write(self, cmd:bytes):
+        self._cmd_q.put(cmd)
+
+    def _send(self, *pairs):
+        """
+        Writes (prefix, argument) pairs as one compound message, skipping
+        any whose argument matches the last one written for that prefix.
+        """
+        cmds = self._changed(pairs)
+        if cmds:
+            self._write(b';'.join(cmds))
+
+    def _changed(self, pairs):
+        cmds = []
+        for prefix, arg in pairs:
+            if self._last.get(prefix) == arg:
+                continue
+            if prefix == self._POW_UNIT:
+                # Cached power level is only meaningful in the old unit
+                self._last.pop(self._POW, None)
+            cmds.append(prefix + arg)
+            self._last[prefix] = arg
+        return cmds
+
+    def _check_range(self, key:str, name:str, value):
+        """
+        Raises a ValueError if <value> is outside the bounds stored under <key>.
+        """
+        low, high = self._BOUNDS[key]
+        if not low <= value <= high:
+            raise ValueError(
+                f'Input parameter <{name}> must be between {low} and {high}, given {value}.')
+
+    def _query(self, cmd:str):
+        self.flush()
+        return self.visa.query(cmd)
+
+    def flush(self):
+        """
+        Blocks until every queued command has been written to the laser.
+
+        Raises:
+            Exception: The first error raised by a queued write, if any.
+        """
+        self._cmd_q.join()
+        err, self._write_error = self._write_error, None
+        if err is not None:
+            raise err
+
+    def clear_cache(self):
+        """
+        Forgets the last written settings, so the next setter calls are
+        always sent. Call this after writing to <visa> directly.
+        """
+        self._last.clear()
+
+    def reset(self):
+        """
+        Resets the laser to its default settings.
+        """
+        self._write(b'*RST')
+        self.clear_cache()
+        self.flush()
+
+    def prefetch(self, *names):
+        """
+        Reads several settings with a single compound query.
+
+        Parameters:
+            *names : str
+                Getter names, e.g. 'get_wavelength', 'get_power'.
+
+        Returns:
+            dict : Getter name mapped to its value.
+
+        Raises:
+            ValueError: A name is not one of the prefetchable getters.
+        """
+        unknown = [name for name in names if name not in self._QUERIES]
+        if unknown:
+            raise ValueError(f'Cannot prefetch: {", ".join(unknown)}.')
+        if not names:
+            return {}
+        replies = self._query(';'.join(self._QUERIES[name][0] for name in names)).split(';')
+        return {name: self._QUERIES[name][1](reply) for name, reply in zip(names, replies)}
 
     def get_wavelength(self):
         """
@@ -33,7 +242,7 @@ class TSL710(visa.resources.GPIBInstrument):
             lam : float
                 Laser output wavelength in nanometers.
         """
-        lam = self.visa.query_ascii_values(':wav?')[0]
+        lam = float(self._query(':wav?'))
         return lam
     
     def set_wavelength(self, lam:float):
@@ -47,11 +256,8 @@ class TSL710(visa.resources.GPIBInstrument):
         Raises:
             ValueError: <lam> is out of range.
         """
-        if lam >= self.min_wl and lam <= self.max_wl:
-            self.visa.write(f':wav {lam}')
-        else:
-            raise ValueError(f'Input parameter <lam> must be between 
-                             {self.min_wl} and {self.max_wl}.')
+        self._check_range('wl', 'lam', lam)
+        self._send((self._WAV, b'%.6f' % lam))
         
     def get_wav_sweep_start(self):
         """
@@ -61,7 +267,7 @@ class TSL710(visa.resources.GPIBInstrument):
             lam : float
                 Start wavelength of laser sweep in nanometers.
         """
-        lam = self.visa.query_ascii_values(':wav:swe:start?')[0]
+        lam = float(self._query(':wav:swe:start?'))
         return lam
     
     def set_wav_sweep_start(self, lam:float):
@@ -75,11 +281,8 @@ class TSL710(visa.resources.GPIBInstrument):
         Raises:
             ValueError: <lam> is out of range.
         """
-        if lam >= self.min_wl and lam <= self.max_wl:
-            self.visa.write(f':wav:swe:start {lam}')
-        else:
-            raise ValueError(f'Input parameter <lam> must be between 
-                             {self.min_wl} and {self.max_wl}.')
+        self._check_range('wl', 'lam', lam)
+        self._send((self._WAV_START, b'%.6f' % lam))
 
     def get_wav_sweep_stop(self):
         """
@@ -89,7 +292,7 @@ class TSL710(visa.resources.GPIBInstrument):
             lam : float
                 Stop wavelength of laser sweep in nanometers.
         """
-        lam = self.visa.query_ascii_values(':wav:swe:stop?')[0]
+        lam = float(self._query(':wav:swe:stop?'))
         return lam
     
     def set_wav_sweep_stop(self, lam:float):
@@ -103,11 +306,8 @@ class TSL710(visa.resources.GPIBInstrument):
         Raises:
             ValueError: <lam> is out of range.
         """
-        if lam >= self.min_wl and lam <= self.max_wl:
-            self.visa.write(f':wav:swe:stop {lam}')
-        else:
-            raise ValueError(f'Input parameter <lam> must be between 
-                             {self.min_wl} and {self.max_wl}.')
+        self._check_range('wl', 'lam', lam)
+        self._send((self._WAV_STOP, b'%.6f' % lam))
         
     def get_wave_sweep_speed(self):
         """
@@ -117,7 +317,7 @@ class TSL710(visa.resources.GPIBInstrument):
             speed : float
                 Sweep speed in nm/sec.
         """
-        speed = self.visa.query_ascii_values(':wav:swe:spe?')[0]
+        speed = float(self._query(':wav:swe:spe?'))
         return speed
     
     def set_wave_sweep_speed(self, speed:float):
@@ -131,11 +331,8 @@ class TSL710(visa.resources.GPIBInstrument):
         Raises:
             ValueError: <speed> is out of range.
         """
-        if speed >= self.min_spd and speed <= self.max_spd:
-            self.visa.write(f':wav:swe:spe {speed}')
-        else:
-            raise ValueError(f'Input parameter <speed> must be between 
-                             {self.min_spd} and {self.max_spd}.')
+        self._check_range('spd', 'speed', speed)
+        self._send((self._WAV_SPEED, b'%.6f' % speed))
         
     def get_wave_sweep_delay(self):
         """
@@ -145,7 +342,7 @@ class TSL710(visa.resources.GPIBInstrument):
             delay : float
                 Wait time in seconds.
         """
-        delay = self.visa.query_ascii_values(':wav:swe:del?')[0]
+        delay = float(self._query(':wav:swe:del?'))
         return delay
     
     def set_wave_sweep_delay(self, delay:float):
@@ -159,11 +356,8 @@ class TSL710(visa.resources.GPIBInstrument):
         Raises:
             ValueError: <delay> is out of range.
         """
-        if delay >= self.min_del and delay <= self.max_del:
-            self.visa.write(f':wav:swe:del {delay}')
-        else:
-            raise ValueError(f'Input parameter <delay> must be between 
-                             {self.min_del} and {self.max_del}.')
+        self._check_range('del', 'delay', delay)
+        self._send((self._WAV_DELAY, b'%.6f' % delay))
         
     def get_wave_sweep_cycles(self):
         """
@@ -173,7 +367,7 @@ class TSL710(visa.resources.GPIBInstrument):
             cycles : int
                 Number of sweep cycles.
         """
-        cycles = self.visa.query_ascii_values(':wav:swe:cycl?')[0]
+        cycles = int(self._query(':wav:swe:cycl?'))
         return cycles
     
     def set_wave_sweep_cycles(self, cycles:int):
@@ -187,10 +381,10 @@ class TSL710(visa.resources.GPIBInstrument):
         Raises:
             ValueError: <cycles> is not an integer between 0-999.
         """
-        if cycles in range(0, 1000):
-            self.visa.write(f':wav:swe:cycl {cycles}')
-        else:
+        if not isinstance(cycles, int):
             raise ValueError('Input parameter <cycles> must be an integer between 0 to 999.')
+        self._check_range('cycl', 'cycles', cycles)
+        self._send((self._WAV_CYCLES, b'%d' % cycles))
         
     def get_wave_sweep_mode(self):
         """
@@ -205,7 +399,7 @@ class TSL710(visa.resources.GPIBInstrument):
             mode : int
                 Sweeping mode number.
         """
-        mode = self.visa.query_ascii_values(':wav:swe:mod?')[0]
+        mode = int(self._query(':wav:swe:mod?'))
         return mode
     
     def set_wave_sweep_mode(self, mode:int):
@@ -224,10 +418,10 @@ class TSL710(visa.resources.GPIBInstrument):
         Raises:
             ValueError: <mode> is neither 0, 1, 2, nor 3.
         """
-        if mode in range(0, 4):
-            self.visa.write(f':wav:swe:mod {mode}')
-        else:
+        if not isinstance(mode, int):
             raise ValueError('Input parameter <mode> must be 0, 1, 2, or 3.')
+        self._check_range('mod', 'mode', mode)
+        self._send((self._WAV_MODE, b'%d' % mode))
         
     def get_power_unit(self, verbose=True):
         """
@@ -241,12 +435,10 @@ class TSL710(visa.resources.GPIBInstrument):
             unit : int or str
                 Either 'dBm' or 'mW'.
         """
-        unit = self.visa.query_ascii_values(':pow:unit?')[0]
+        unit = int(self._query(':pow:unit?'))
+        self._changed(((self._POW_UNIT, b'%d' % unit),))
         if verbose:
-            if unit == 0:
-                return 'dBm'
-            else:
-                return 'mW'
+            return self._POW_UNITS[unit]
         else:
             return unit
     
@@ -261,13 +453,10 @@ class TSL710(visa.resources.GPIBInstrument):
         Raises:
             ValueError: <unit> is neither 'mW' nor 'dBm'.
         """
-        if unit == 'dBm':
-            unit = 0
-        elif unit == 'mW':
-            unit = 1
-        else:
+        if unit not in self._POW_UNIT_NUMS:
             raise ValueError('Input parameter <unit> must be either "mW" or "dBm".')
-        self.visa.write(f':pow:unit {unit}')
+        unit_num = self._POW_UNIT_NUMS[unit]
+        self._send((self._POW_UNIT, b'%d' % unit_num))
         
     def get_power(self, unit='mW'):
         """
@@ -282,7 +471,7 @@ class TSL710(visa.resources.GPIBInstrument):
                 Optical output power level.
         """
         self.set_power_unit(unit=unit)
-        pow = self.visa.query_ascii_values(':pow?')[0]
+        pow = float(self._query(':pow?'))
         return pow
     
     def set_power(self, pow:float, unit='mW'):
@@ -295,23 +484,15 @@ class TSL710(visa.resources.GPIBInstrument):
                 Optical output power level.
             unit : str, optional
                 Either 'dBm' or 'mW' ('mW' by default).
+
+        Raises:
+            ValueError: <unit> is invalid or <pow> is out of range.
         """
-        self.set_power_unit(unit=unit)
-        if unit == 'mW':
-            if pow >= self.min_pow_mW and pow <= self.max_pow_mW:
-                pass
-            else:
-                raise ValueError(f'Input parameter <pow> must be between 
-                                 {self.min_pow_mW} and {self.max_pow_mW} mW.')
-        elif unit == 'dBm':
-            if pow >= self.min_pow_dBm and pow <= self.max_pow_dBm:
-                pass
-            else:
-                raise ValueError(f'Input parameter <pow> must be between 
-                                 {self.min_pow_dBm} and {self.max_pow_dBm} dBm.')
-        else:
+        if unit not in self._POW_UNIT_NUMS:
             raise ValueError('Input parameter <unit> must be "mW" or "dBm".')
-        self.visa.write(f':pow {pow}')
+        self._check_range(unit, 'pow', pow)
+        self._send((self._POW_UNIT, b'%d' % self._POW_UNIT_NUMS[unit]),
+                   (self._POW, b'%.6f' % pow))
 
     def get_trig_out(self):
         """
@@ -323,9 +504,8 @@ class TSL710(visa.resources.GPIBInstrument):
             'start' for trigger at start of a sweep
             'step' for trigger at each step in a sweep
         """
-        settings = {0:'none', 1:'stop', 2:'start', 3:'step'}
-        trig = self.visa.query_ascii_values(':trig:outp?')[0]
-        return settings[trig]
+        trig = int(self._query(':trig:outp?'))
+        return self._TRIG_OUTS[trig]
 
     def set_trig_out(self, trig:str):
         """
@@ -338,15 +518,199 @@ class TSL710(visa.resources.GPIBInstrument):
         Raises:
             ValueError: <trig> was not any of the above settings.
         """
-        settings = {'none':0, 'stop':1, 'start':2, 'step':3}
-        if trig.lower() in settings.keys():
-            trig_num = settings[trig.lower()]
-            self.visa.write(f':trig:outp {trig_num}')
+        trig_num = self._TRIG_OUT_NUMS.get(trig.lower())
+        if trig_num is not None:
+            self._send((self._TRIG_OUT, b'%d' % trig_num))
         else:
             raise ValueError('Input parameter <trig> must be "none", "stop", "start", or "step".')
 
+    def configure(self, **kwargs):
+        """
+        Sets several laser parameters at once. All values are validated
+        before anything is sent, then the commands are chained with ';'
+        into a single SCPI message so that only one write is issued.
+
+        Parameters:
+            start : float, optional
+                Start wavelength of laser sweep in nanometers.
+            stop : float, optional
+                Stop wavelength of laser sweep in nanometers.
+            speed : float, optional
+                Sweep speed in nm/sec.
+            delay : float, optional
+                Wait time between sweeps in seconds.
+            cycles : int, optional
+                Number of sweep cycles.
+            mode : int, optional
+                Sweeping mode number.
+            unit : str, optional
+                Either 'dBm' or 'mW'. Defaults to 'mW' if <power> is given.
+            power : float, optional
+                Optical output power level.
+            trig : str, optional
+                Either "none", "stop", "start", or "step".
+
+        Raises:
+            ValueError: A parameter is unrecognized, out of range, or not an integer where one is required.
+        """
+        self._send(*self._config_cmds(kwargs))
+
+    def _config_cmds(self, kwargs:dict):
+        params = {
+            'start': (self._WAV_START, b'%.6f', 'wl'),
+            'stop': (self._WAV_STOP, b'%.6f', 'wl'),
+            'speed': (self._WAV_SPEED, b'%.6f', 'spd'),
+            'delay': (self._WAV_DELAY, b'%.6f', 'del'),
+            'cycles': (self._WAV_CYCLES, b'%d', 'cycl'),
+            'mode': (self._WAV_MODE, b'%d', 'mod'),
+        }
+        unknown = set(kwargs) - set(params) - {'unit', 'power', 'trig'}
+        if unknown:
+            raise ValueError(f'Unrecognized parameter(s): {", ".join(sorted(unknown))}.')
+
+        cmds = []
+        for key, (cmd, fmt, bound) in params.items():
+            if key in kwargs:
+                value = kwargs[key]
+                if fmt == b'%d' and not isinstance(value, int):
+                    raise ValueError(f'Input parameter <{key}> must be an integer, given {value}.')
+                self._check_range(bound, key, value)
+                cmds.append((cmd, fmt % value))
+
+        if 'unit' in kwargs or 'power' in kwargs:
+            unit = kwargs.get('unit', 'mW')
+            if unit not in self._POW_UNIT_NUMS:
+                raise ValueError('Input parameter <unit> must be either "mW" or "dBm".')
+            cmds.append((self._POW_UNIT, b'%d' % self._POW_UNIT_NUMS[unit]))
+            if 'power' in kwargs:
+                pow = kwargs['power']
+                self._check_range(unit, 'power', pow)
+                cmds.append((self._POW, b'%.6f' % pow))
+
+        if 'trig' in kwargs:
+            trig = kwargs['trig'].lower()
+            if trig not in self._TRIG_OUT_NUMS:
+                raise ValueError('Input parameter <trig> must be "none", "stop", "start", or "step".')
+            cmds.append((self._TRIG_OUT, b'%d' % self._TRIG_OUT_NUMS[trig]))
+
+        return cmds
+
+    def run_sweep(self, start:float, stop:float, speed:float, delay=0, cycles=1, mode=1, trig='step'):
+        """
+        Configures and starts a wavelength sweep with a single SCPI write.
+        All parameters are validated before anything is sent.
+
+        Parameters:
+            start : float
+                Start wavelength of laser sweep in nanometers.
+            stop : float
+                Stop wavelength of laser sweep in nanometers.
+            speed : float
+                Sweep speed in nm/sec.
+            delay : float, optional
+                Wait time between sweeps in seconds (0 by default).
+            cycles : int, optional
+                Number of sweep cycles (1 by default).
+            mode : int, optional
+                Sweeping mode number (1, continuous one-way, by default).
+            trig : str, optional
+                Either "none", "stop", "start", or "step" ("step" by default).
+
+        Raises:
+            ValueError: A parameter is out of range.
+        """
+        self._start_sweep(self._config_cmds(dict(start=start, stop=stop, speed=speed, delay=delay,
+                                                 cycles=cycles, mode=mode, trig=trig)))
+
+    def define_sweep(self, name:str, start:float, stop:float, speed:float, delay=0, cycles=1, mode=1, trig='step'):
+        """
+        Validates and encodes a set of sweep settings once and saves them
+        under <name>, so that run_saved_sweep() can start the sweep without
+        repeating the checks. Parameters are the same as for run_sweep().
+
+        Raises:
+            ValueError: A parameter is out of range.
+        """
+        self._sweeps[name] = self._config_cmds(dict(start=start, stop=stop, speed=speed, delay=delay,
+                                                     cycles=cycles, mode=mode, trig=trig))
+
+    def run_saved_sweep(self, name:str):
+        """
+        Configures and starts a sweep previously saved with define_sweep(),
+        with a single SCPI write.
+
+        Parameters:
+            name : str
+                Name given to define_sweep().
+
+        Raises:
+            KeyError: No sweep was defined under <name>.
+        """
+        self._start_sweep(self._sweeps[name])
+
+    def _start_sweep(self, pairs):
+        # Clear any end-of-sweep event latched by an earlier sweep
+        cmds = [self._CLEAR_STATUS] + self._changed(pairs)
+        cmds.append(self._SWEEP_ON)
+        self._write(b';'.join(cmds))
+
+    def step_sweep(self, wavelengths, read_fn):
+        """
+        Steps the laser through a list of wavelengths and collects one
+        reading per step. The write for each wavelength is handed to the
+        writer thread before <read_fn> is called for the previous step, so
+        the GPIB write overlaps the read. <read_fn> must therefore return a
+        reading that was already latched at the previous wavelength, e.g.
+        from a detector triggered by the laser's step trigger output.
+
+        Parameters:
+            wavelengths : array-like
+                Laser output wavelengths in nanometers.
+            read_fn : callable
+                Called with no arguments once per wavelength.
+
+        Returns:
+            results : list
+                Return values of <read_fn>, one per wavelength.
+
+        Raises:
+            ValueError: A wavelength is out of range.
+        """
+        wavelengths = list(wavelengths)
+        for lam in wavelengths:
+            self._check_range('wl', 'lam', lam)
+
+        results = []
+        for idx, lam in enumerate(wavelengths):
+            self.set_wavelength(lam)
+            if idx > 0:
+                results.append(read_fn())
+            self.flush()
+        if wavelengths:
+            results.append(read_fn())
+        return results
+
+    def wait_for_sweep_complete(self, timeout_ms=10000):
+        """
+        Blocks until the laser raises a service request at the end of a
+        sweep, instead of polling the wavelength over GPIB. The operation
+        event register is read afterwards to clear it for the next sweep.
+
+        Parameters:
+            timeout_ms : int, optional
+                Maximum time to wait in milliseconds (10000 by default).
+
+        Raises:
+            pyvisa.errors.VisaIOError: No service request within <timeout_ms>.
+        """
+        self.flush()
+        self.visa.wait_for_srq(timeout=timeout_ms)
+        self.visa.query(':stat:oper?')
+
     def output_off(self):
-        self.visa.write(':pow:stat 0')
+        self._write(b':pow:stat 0')
+        self.flush()
     
     def output_on(self):
-        self.visa.write(':pow:stat 1')
\ No newline at end of file
+        self._write(b':pow:stat 1')
+        self.flush()
\ No newline at end of file
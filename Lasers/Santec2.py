@@ -3,75 +3,91 @@ Python wrapper for Santec Lazers
 Author(s): Howard Dao
 """
 
+import functools
+
 import pyvisa as visa
 
 class SantecLaser(visa.resources.GPIBInstrument):
+    # Model name expected in the second field of *IDN?
+    _EXPECTED_MODEL = None
+
+    # Model limits, overridden by subclasses
+    min_wl = None
+    max_wl = None
+    min_spd = None
+    max_spd = None
+    max_del = None
+
+    min_pow_mW = None
+    max_pow_mW = None
+    min_pow_dBm = None
+    max_pow_dBm = None
+
     def __init__(self, visa):
-        self.idn = visa.query('*IDN?')
-        self.idn = self.idn.split(',')
+        visa.write_termination = '\n'
+        visa.read_termination = '\n'
+        visa.send_end = True
+        visa.query_delay = 0.0
+        visa.timeout = 10000
+        self.idn = tuple(visa.query('*IDN?').split(',', 3))
         if self.idn[0] != 'SANTEC':
             print('Device not recognized as a Santec device.')
+        elif self._EXPECTED_MODEL is not None and self.idn[1] != self._EXPECTED_MODEL:
+            print(f'{self.idn[0]} device not recognized as {self._EXPECTED_MODEL}.')
         self.visa = visa
 
-        self.min_wl = None
-        self.max_wl = None
-        self.min_spd = None
-        self.max_spd = None
-        self.max_del = None
-
-        self.min_pow_mW = None
-        self.max_pow_mW = None
-        self.min_pow_dBm = None
-        self.max_pow_dBm = None
-
     @property
     def wavelength(self):
-        return self.visa.query_ascii_values(':wav?')[0]
-    @property.setter
+        return float(self.visa.query(':wav?'))
+    @wavelength.setter
     def wavelength(self, lam:float):
-        if lam < self.min_wl or lam > self.max_wl:
+        lo, hi = self.min_wl, self.max_wl
+        if not lo <= lam <= hi:
             raise ValueError(
-                f'Input parameter <lam> must be between {self.min_wl} to {self.max_wl}. It was given {lam}.')
+                f'Input parameter <lam> must be between {lo} to {hi}. It was given {lam}.')
         self.visa.write(f':wav {lam}')
     
     @property
     def wave_sweep_start(self):
-        return self.visa.query_ascii_values(':wav:swe:start?')[0]
-    @property.setter
+        return float(self.visa.query(':wav:swe:start?'))
+    @wave_sweep_start.setter
     def wave_sweep_start(self, lam:float):
-        if lam < self.min_wl or lam > self.max_wl:
+        lo, hi = self.min_wl, self.max_wl
+        if not lo <= lam <= hi:
             raise ValueError(
-                f'Input parameter <lam> must be between {self.min_wl} to {self.max_wl}. It was given {lam}.')
+                f'Input parameter <lam> must be between {lo} to {hi}. It was given {lam}.')
         self.visa.write(f':wav:swe:start {lam}')
 
     @property
     def wave_sweep_stop(self):
-        return self.visa.query_ascii_values(':wav:swe:stop?')[0]
-    @property.setter
+        return float(self.visa.query(':wav:swe:stop?'))
+    @wave_sweep_stop.setter
     def wave_sweep_stop(self, lam:float):
-        if lam < self.min_wl or lam > self.max_wl:
+        lo, hi = self.min_wl, self.max_wl
+        if not lo <= lam <= hi:
             raise ValueError(
-                f'Input parameter <lam> must be between {self.min_wl} to {self.max_wl}. It was given {lam}.')
+                f'Input parameter <lam> must be between {lo} to {hi}. It was given {lam}.')
         self.visa.write(f':wav:swe:stop {lam}')
 
     @property
     def wave_sweep_speed(self):
-        return self.visa.query_ascii_values(':wav:swe:spe?')[0]
-    @property.setter
+        return float(self.visa.query(':wav:swe:spe?'))
+    @wave_sweep_speed.setter
     def wave_sweep_speed(self, speed:float):
-        if speed < self.min_spd or speed > self.max_spd:
+        lo, hi = self.min_spd, self.max_spd
+        if not lo <= speed <= hi:
             raise ValueError(
-                f'Input parameter <speed> must be between {self.min_spd} to {self.max_spd}. It was given {speed}.')
+                f'Input parameter <speed> must be between {lo} to {hi}. It was given {speed}.')
         self.visa.write(f':wav:swe:spe {speed}')
     
     @property
     def power_unit(self):
-        unit = self.visa.query_ascii_values(':pow:unit?')[0]
+        unit = int(self.visa.query(':pow:unit?'))
         if unit == 0:
             return 'dBm'
         else:
             return 'mW'
-    @property.setter
+    @power_unit.setter
     def power_unit(self, unit:str):
         if unit == 'dBm':
             unit_num = 0
@@ -82,19 +98,26 @@ class SantecLaser(visa.resources.GPIBInstrument):
         self.visa.write(f':pow:unit {unit_num}')
         self.pow_unit = unit
 
+    @functools.cached_property
+    def pow_unit(self):
+        # Queried on first use, then kept in sync by the power_unit setter
+        return self.power_unit
+
     @property
     def power(self):
-        return self.visa.query_ascii_values(':pow?')[0]
-    @property.setter
+        return float(self.visa.query(':pow?'))
+    @power.setter
     def power(self, pow:float):
         if self.pow_unit == 'mW':
-            if pow < self.min_pow_mW or pow > self.max_pow_mW:
+            lo, hi = self.min_pow_mW, self.max_pow_mW
+            if not lo <= pow <= hi:
                 raise ValueError(
-                    f'Input parameter <pow> must be between {self.min_pow_mW} and {self.max_pow_mW} mW. It was given {pow}.')
+                    f'Input parameter <pow> must be between {lo} and {hi} mW. It was given {pow}.')
         else:
-            if pow < self.min_pow_dBm or pow > self.max_pow_dBm:
+            lo, hi = self.min_pow_dBm, self.max_pow_dBm
+            if not lo <= pow <= hi:
                 raise ValueError(
-                    f'Input parameter <pow> must be between {self.min_pow_dBm} and {self.max_pow_dBm} dBm. It was given {pow}.')
+                    f'Input parameter <pow> must be between {lo} and {hi} dBm. It was given {pow}.')
         self.visa.write(f':pow {pow}')
         
     def output_off(self):
@@ -110,37 +133,29 @@ class SantecLaser(visa.resources.GPIBInstrument):
         self.visa.write(':wav:swe 1')
 
 class TSL710(SantecLaser):
-    def __init__(self, visa):
-        super().__init__(visa)
-        if self.idn[1] != 'TSL-710':
-            print(f'{self.idn[0]} device not recognized as TSL-710.')
-        self.visa = visa
+    _EXPECTED_MODEL = 'TSL-710'
 
-        self.min_wl = 1480
-        self.max_wl = 1640
-        self.min_spd = 0.5
-        self.max_spd = 100
-        self.max_del = 999.9
+    min_wl = 1480
+    max_wl = 1640
+    min_spd = 0.5
+    max_spd = 100
+    max_del = 999.9
 
-        self.min_pow_mW = 0.01
-        self.max_pow_mW = 10
-        self.min_pow_dBm = -20
-        self.max_pow_dBm = 10
+    min_pow_mW = 0.01
+    max_pow_mW = 10
+    min_pow_dBm = -20
+    max_pow_dBm = 10
 
 class TSL770(SantecLaser):
-    def __init__(self, visa):
-        super().__init__(visa)
-        if self.idn[1] != 'TSL-770':
-            print(f'{self.idn[0]} device not recognized as TSL-770')
-        self.visa = visa
-
-        self.min_wl = 1480
-        self.max_wl = 1640
-        self.min_spd = 0.5
-        self.max_spd = 200
-        self.max_del = 999.9
-
-        self.min_pow_mW = 0.2
-        self.max_pow_mW = 19.953
-        self.min_pow_dBm = -7
-        self.max_pow_dBm = 13
\ No newline at end of file
+    _EXPECTED_MODEL = 'TSL-770'
+
+    min_wl = 1480
+    max_wl = 1640
+    min_spd = 0.5
+    max_spd = 200
+    max_del = 999.9
+
+    min_pow_mW = 0.2
+    max_pow_mW = 19.953
+    min_pow_dBm = -7
+    max_pow_dBm = 13
\ No newline at end of file
@@ -3,35 +3,164 @@ Python wrapper for Agilent Lightwave Measurement System Modules
 Author(s): Howard Dao
 """
 
+import contextlib
+import functools
+import threading
+import weakref
+
+import numpy as np
 import pyvisa as visa
 
+_TRIG_CONF = frozenset({'dis', 'def', 'pass', 'loop'})
+_TRIG_IN = frozenset({'ign', 'sme', 'cme', 'next', 'sws'})
+_TRIG_OUT = frozenset({'dis', 'avg', 'meas', 'mod', 'stf', 'swf', 'swst'})
+_SWEEP_MODES = frozenset({'step', 'man', 'cont'})
+_POW_UNITS = frozenset({'dBm', 'W'})
+_SLOTS = range(0,5)
+_SLOTS_EMPTY_QUERY = ';'.join(f':slot{idx}:empt?' for idx in _SLOTS)
+
+# Identification replies per open session, shared by every module object on
+# the same mainframe. Entries go away with the session or on close().
+_IDN_CACHE = weakref.WeakKeyDictionary()
+
+def _query_once(visa, cmd:str):
+    """
+    Returns the reply to an identification query, asking the instrument only
+    the first time <cmd> is sent on this session.
+    """
+    replies = _IDN_CACHE.setdefault(visa, {})
+    try:
+        return replies[cmd]
+    except KeyError:
+        reply = replies[cmd] = visa.query(cmd)
+        return reply
+
+def _prefetch_idn(visa, slot:int):
+    """
+    Reads the mainframe and <slot> identification replies with one compound
+    query when neither is cached yet for this session.
+    """
+    replies = _IDN_CACHE.setdefault(visa, {})
+    slot_cmd = f':slot{slot}:idn?'
+    if '*IDN?' not in replies and slot_cmd not in replies:
+        replies['*IDN?'], replies[slot_cmd] = visa.query(f'*IDN?;{slot_cmd}').split(';', 1)
+
+def cached_query(func):
+    """
+    Caches the return value of a getter on the instance until a setter
+    pops it from <self._cache>, keyed by the getter's name.
+    """
+    @functools.wraps(func)
+    def wrapper(self):
+        try:
+            return self._cache[func.__name__]
+        except KeyError:
+            value = self._cache[func.__name__] = func(self)
+            return value
+    return wrapper
+
 class AgilentMainframe(visa.resources.GPIBInstrument):
-    def __init__(self, visa):
-        self.idn = visa.query('*IDN?')
-        self.idn = self.idn.split(',')
+    # (manufacturer, model) expected from a module's :slot<n>:idn? reply
+    _EXPECTED_MODULE = None
+
+    def __init__(self, visa, slot=None):
+        visa.write_termination = '\n'
+        visa.read_termination = '\n'
+        visa.send_end = True
+        visa.query_delay = 0.0
+        visa.timeout = 10000
+        if slot is not None:
+            _prefetch_idn(visa, slot)
+        self.idn = tuple(_query_once(visa, '*IDN?').split(',', 3))
         if self.idn[0] != 'Agilent Technologies' or self.idn[1] != '8164B':
             print('Device not recognized as Keysight 8164B.')
         self.visa = visa
+        self.visa.chunk_size = 1 << 20
+        self._cache = {}
+
+    @contextlib.contextmanager
+    def _binary_mode(self):
+        """
+        Turns off the read termination for the duration of a binary block
+        read, so the reply is not scanned for termination characters.
+        """
+        read_termination = self.visa.read_termination
+        self.visa.read_termination = None
+        try:
+            yield
+        finally:
+            self.visa.read_termination = read_termination
+
+    def _identify_module(self, slot:int):
+        """
+        Queries the identity of the module in <slot> and warns if it does not
+        match the class's expected module.
+        """
+        self.module_id = tuple(_query_once(self.visa, f':slot{slot}:idn?').split(','))
+        expected = self._EXPECTED_MODULE
+        if expected is not None and self.module_id[:2] != expected:
+            print(f'Slot module not recognized as {expected[0]} {expected[1].strip()}.')
+
+    def close(self):
+        """
+        Closes the session and forgets its cached identification replies.
+        """
+        _IDN_CACHE.pop(self.visa, None)
+        self.visa.close()
+
+    def clear_cache(self):
+        """
+        Forgets all cached getter values, so the next reads query the instrument.
+        """
+        self._cache.clear()
+
+    @classmethod
+    def discover(cls, visa, slots=_SLOTS):
+        """
+        Identifies the modules in <slots> of the mainframe on session <visa>.
+
+        Parameters:
+            visa : pyvisa resource
+                Open mainframe session.
+            slots : iterable of int, optional
+                Slots to probe.
+
+        Returns:
+            dict : Occupied slot -> (manufacturer, model).
+        """
+        # One compound query for the empty flags, then one for the occupied
+        # slots whose idn reply is not already cached for this session
+        if slots is _SLOTS:
+            empty_query = _SLOTS_EMPTY_QUERY
+        else:
+            slots = list(slots)
+            empty_query = ';'.join(f':slot{idx}:empt?' for idx in slots)
+        empties = visa.query(empty_query).split(';')
+        occupied = [idx for idx, is_empty in zip(slots, empties) if not int(is_empty)]
+        replies = _IDN_CACHE.setdefault(visa, {})
+        missing = [idx for idx in occupied if f':slot{idx}:idn?' not in replies]
+        if missing:
+            ids = visa.query(';'.join(f':slot{idx}:idn?' for idx in missing)).split(';')
+            for idx, reply in zip(missing, ids):
+                replies[f':slot{idx}:idn?'] = reply
+        return {idx: tuple(replies[f':slot{idx}:idn?'].split(',')[:2]) for idx in occupied}
 
     def list_modules(self):
         """
         Prints whether the slots have modules and what those modules are.
         """
-        for idx in range(0,5):
-            is_empty = self.visa.query_ascii_values(f':slot{idx}:empt?')[0]
-            if is_empty:
+        modules = self.discover(self.visa)
+        for idx in _SLOTS:
+            if idx not in modules:
                 print(f'Slot {idx} is empty.')
             else:
-                module_id = self.visa.query(f':slot{idx}:idn?')
-                module_id = module_id.split(',')
-                print(f'Slot {idx} contains {module_id[0]} {module_id[1]}.')
+                print(f'Slot {idx} contains {modules[idx][0]} {modules[idx][1]}.')
 
     def get_trig_config(self):
         """
         Returns the hardware trigger configuration with regard to output and input trigger connectors.
         """
-        trig = self.visa.query_ascii_values(':trig:conf?', converter='s')[0]
-        trig = trig.strip('\n')
+        trig = self.visa.query(':trig:conf?')
         return trig
     
     def set_trig_config(self, conf:str):
@@ -45,8 +174,7 @@ class AgilentMainframe(visa.resources.GPIBInstrument):
                 PASS:   Trigger at input generates a trigger at output.
                 LOOP:   Trigger at output generates a trigger at input.
         """
-        settings = ['dis', 'def', 'pass', 'loop']
-        if conf.lower() not in settings:
+        if conf.lower() not in _TRIG_CONF:
             raise ValueError(
                 'Input parameter <conf> not one of the correct strings.')
         self.visa.write(f':trig:conf {conf}')
@@ -55,8 +183,7 @@ class AgilentMainframe(visa.resources.GPIBInstrument):
         """
         Returns the input trigger response.
         """
-        trig = self.visa.query_ascii_values(f':trig{self.slot}:inp?', converter='s')[0]
-        trig = trig.rstrip('\n')
+        trig = self.visa.query(f':trig{self.slot}:inp?')
         return trig
     
     def set_trig_in(self, trig:str):
@@ -71,8 +198,7 @@ class AgilentMainframe(visa.resources.GPIBInstrument):
                 NEXT:   Perform next step of a stepped sweep.
                 SWS:    Start a sweep cycle.
         """
-        settings = ['ign', 'sme', 'cme', 'next', 'sws']
-        if trig.lower() not in settings:
+        if trig.lower() not in _TRIG_IN:
             raise ValueError(
                 'Input parameter <trig> is not set to a correct string.')
         self.visa.write(f':trig{self.slot}:inp {trig}')
@@ -81,8 +207,7 @@ class AgilentMainframe(visa.resources.GPIBInstrument):
         """
         Returns the output trigger condition.
         """
-        trig = self.visa.query_ascii_values(f':trig{self.slot}:outp?', converter='s')[0]
-        trig = trig.rstrip('\n')
+        trig = self.visa.query(f':trig{self.slot}:outp?')
         return trig
     
     def set_trig_out(self, trig:str):
@@ -99,41 +224,149 @@ class AgilentMainframe(visa.resources.GPIBInstrument):
                 SWF:    When a sweep cycle finishes.
                 SWST:   When a sweep cycle begins.
         """
-        settings = ['dis', 'avg', 'meas', 'mod', 'stf', 'swf', 'swst']
-        if trig.lower() not in settings:
+        if trig.lower() not in _TRIG_OUT:
             raise ValueError(
                 'Input parameter <trig> is not one of the correct strings.')
         self.visa.write(f':trig{self.slot}:outp {trig}')
 
+    def configure_triggers(self, conf=None, inp=None, outp=None):
+        """
+        Sets the trigger configuration, input trigger response, and output
+        trigger condition with a single compound SCPI write. Parameters left
+        as None are not changed. If an instrument rejects compound commands,
+        call set_trig_config, set_trig_in, and set_trig_out one at a time instead.
+
+        Parameters:
+            conf : str, optional
+                Trigger configuration, see set_trig_config.
+            inp : str, optional
+                Input trigger response, see set_trig_in.
+            outp : str, optional
+                Output trigger condition, see set_trig_out.
+
+        Raises:
+            ValueError: A parameter is not one of the correct strings.
+        """
+        cmds = []
+        if conf is not None:
+            if conf.lower() not in _TRIG_CONF:
+                raise ValueError(
+                    'Input parameter <conf> not one of the correct strings.')
+            cmds.append(f':trig:conf {conf}')
+        if inp is not None:
+            if inp.lower() not in _TRIG_IN:
+                raise ValueError(
+                    'Input parameter <inp> is not set to a correct string.')
+            cmds.append(f':trig{self.slot}:inp {inp}')
+        if outp is not None:
+            if outp.lower() not in _TRIG_OUT:
+                raise ValueError(
+                    'Input parameter <outp> is not one of the correct strings.')
+            cmds.append(f':trig{self.slot}:outp {outp}')
+        if cmds:
+            self.visa.write(';'.join(cmds))
+
 class AgilentLaser(AgilentMainframe):
     """
     Tunable laser
     """
+    # Getter name -> (query template, reply type), used by prefetch()
+    _QUERIES = {
+        'get_wavelength': (':sour{slot}:wav?', float),
+        'get_wave_sweep_start': (':sour{slot}:wav:swe:star?', float),
+        'get_wave_sweep_stop': (':sour{slot}:wav:swe:stop?', float),
+        'get_wave_step_size': (':sour{slot}:wav:swe:step?', float),
+        'get_wave_sweep_speed': (':sour{slot}:wav:swe:spe?', float),
+        'get_power': (':sour{slot}:pow?', float),
+        'get_expected_ntriggers': (':sour{slot}:wav:swe:exp?', int),
+        'get_flag': (':sour{slot}:wav:swe:flag?', int),
+    }
+    # Getters whose values are settings and may be cached; the output
+    # wavelength, power and sweep flag change on their own during a sweep
+    _CACHED_QUERIES = frozenset({'get_wave_sweep_start', 'get_wave_sweep_stop',
+                                 'get_wave_sweep_speed'})
+
+    # Model limits, overridden by subclasses; wavelength limits are queried
+    min_step = None
+    max_step = None
+    min_spd = None
+    max_spd = None
+
+    min_pow_dBm = None
+    max_pow_dBm = None
+    min_pow_mW = None
+    max_pow_mW = None
+
     def __init__(self, visa, slot:int, wl_unit='m'):
-        super().__init__(visa)
-        self.visa = visa
+        super().__init__(visa, slot)
         self.slot = slot
+        self._identify_module(slot)
         self.wl_unit = wl_unit
-        self.pow_unit = self.get_power_unit()
 
-        self.min_wl = None
-        self.max_wl = None
+        # Setter templates, bound once since <slot> and <wl_unit> never change
+        self._fmt_set_wav = f':sour{slot}:wav {{}}{wl_unit}'.format
+        self._fmt_set_wav_start = f':sour{slot}:wav:swe:star {{}}{wl_unit}'.format
+        self._fmt_set_wav_stop = f':sour{slot}:wav:swe:stop {{}}{wl_unit}'.format
+        self._fmt_set_wav_step = f':sour{slot}:wav:swe:step {{}}{wl_unit}'.format
+        self._fmt_set_wav_speed = f':sour{slot}:wav:swe:spe {{}}m/s'.format
+        self._fmt_set_wav_mode = f':sour{slot}:wav:swe:mode {{}}'.format
+        self._fmt_set_pow_unit = f':sour{slot}:pow:unit {{}}'.format
+        self._fmt_set_pow = f':sour{slot}:pow {{}}{{}}'.format
+
+        # Hot-path queries and fixed commands, built once for the same reason
+        self._qry_wav = f':sour{slot}:wav?'
+        self._qry_pow = f':sour{slot}:pow?'
+        self._qry_flag = f':sour{slot}:wav:swe:flag?'
+        self._cmd_soft_trig = f':sour{slot}:wav:swe:soft'
+        self._cmd_output_off = f':sour{slot}:pow:stat 0'
+        self._cmd_output_on = f':sour{slot}:pow:stat 1'
+        self._cmd_sweep_stop = f':sour{slot}:wav:swe 0'
+        self._cmd_sweep_start = f':sour{slot}:wav:swe 1'
+
+        # Query both wavelength limits in one compound message
+        limits = self.visa.query(f':sour{slot}:wav? min;:sour{slot}:wav? max').split(';')
+        self.min_wl = float(limits[0])
+        self.max_wl = float(limits[1])
+
+        self._flag = None
+        self._flag_monitor = None
+        self._flag_monitor_stop = threading.Event()
+        self._flag_stale = threading.Event()
+        self._flag_monitor_error = None
+
+    def prefetch(self, *names):
+        """
+        Reads several numeric settings with a single compound query. Results
+        for the memoized getters also refresh their cache.
 
-        self.min_step = None
-        self.max_step = None
-        self.min_spd = None
-        self.max_spd = None
+        Parameters:
+            *names : str
+                Getter names, e.g. 'get_wavelength', 'get_power'.
+
+        Returns:
+            dict : Getter name mapped to its value.
 
-        self.min_pow_dBm = None
-        self.max_pow_dBm = None
-        self.min_pow_mW = None
-        self.max_pow_mW = None
+        Raises:
+            ValueError: A name is not one of the prefetchable getters.
+        """
+        unknown = [name for name in names if name not in self._QUERIES]
+        if unknown:
+            raise ValueError(f'Cannot prefetch: {", ".join(unknown)}.')
+        if not names:
+            return {}
+        cmd = ';'.join(self._QUERIES[name][0].format(slot=self.slot) for name in names)
+        replies = self.visa.query(cmd).split(';')
+        values = {name: self._QUERIES[name][1](reply) for name, reply in zip(names, replies)}
+        self._cache.update((name, value) for name, value in values.items()
+                           if name in self._CACHED_QUERIES)
+        return values
 
     def get_wavelength(self):
         """
-        Returns the laser wavelength.
+        Returns the laser wavelength. Always queried, since the output
+        wavelength changes during a sweep.
         """
-        lam = self.visa.query_ascii_values(f':sour{self.slot}:wav?')[0]
+        lam = float(self.visa.query(self._qry_wav))
         return lam
     
     def set_wavelength(self, lam:float):
@@ -144,16 +377,18 @@ class AgilentLaser(AgilentMainframe):
             lam : float
                 Laser wavelength.
         """
-        if lam < self.min_wl or lam > self.max_wl:
+        lo, hi = self.min_wl, self.max_wl
+        if not lo <= lam <= hi:
             raise ValueError(
-                f'Input parameter <lam> must be between {self.min_wl} and {self.max_wl}.')
-        self.visa.write(f':sour{self.slot}:wav {lam}{self.wl_unit}')
+                f'Input parameter <lam> must be between {lo} and {hi}.')
+        self.visa.write(self._fmt_set_wav(lam))
 
+    @cached_query
     def get_wave_sweep_start(self):
         """
         Returns the start wavelength of a laser sweep.
         """
-        lam = self.visa.query_ascii_values(f':sour{self.slot}:wav:swe:star?')[0]
+        lam = float(self.visa.query(f':sour{self.slot}:wav:swe:star?'))
         return lam
     
     def set_wave_sweep_start(self, lam:float):
@@ -167,16 +402,19 @@ class AgilentLaser(AgilentMainframe):
         Raises:
             ValueError: <lam> is out of range.
         """
-        if lam < self.min_wl or lam > self.max_wl:
-            return ValueError(
-                f'Input parameter <lam> must be between {self.min_wl} and {self.max_wl}.')
-        self.visa.write(f':sour{self.slot}:wav:swe:star {lam}{self.wl_unit}')
+        lo, hi = self.min_wl, self.max_wl
+        if not lo <= lam <= hi:
+            raise ValueError(
+                f'Input parameter <lam> must be between {lo} and {hi}.')
+        self._cache.pop('get_wave_sweep_start', None)
+        self.visa.write(self._fmt_set_wav_start(lam))
 
+    @cached_query
     def get_wave_sweep_stop(self):
         """
         Returns the stop wavelength of a laser sweep.
         """
-        lam = self.visa.query_ascii_values(f':sour{self.slot}:wav:swe:stop?')[0]
+        lam = float(self.visa.query(f':sour{self.slot}:wav:swe:stop?'))
         return lam
     
     def set_wave_sweep_stop(self, lam:float):
@@ -190,16 +428,18 @@ class AgilentLaser(AgilentMainframe):
         Raises:
             ValueError: <lam> is out of range.
         """
-        if lam < self.min_wl or lam > self.max_wl:
-            return ValueError(
-                f'Input parameter <lam> must be between {self.min_wl} and {self.max_wl}.')
-        self.visa.write(f':sour{self.slot}:wav:swe:stop {lam}{self.wl_unit}')
+        lo, hi = self.min_wl, self.max_wl
+        if not lo <= lam <= hi:
+            raise ValueError(
+                f'Input parameter <lam> must be between {lo} and {hi}.')
+        self._cache.pop('get_wave_sweep_stop', None)
+        self.visa.write(self._fmt_set_wav_stop(lam))
 
     def get_wave_step_size(self):
         """
         Returns the wavelength sweep step size in meters.
         """
-        step = self.visa.query_ascii_values(f':sour{self.slot}:wav:swe:step?')[0]
+        step = float(self.visa.query(f':sour{self.slot}:wav:swe:step?'))
         return step
     
     def set_wave_step_size(self, step:float):
@@ -210,13 +450,14 @@ class AgilentLaser(AgilentMainframe):
             step : float
                 Step size
         """
-        self.visa.write(f':sour{self.slot}:wav:swe:step {step}{self.wl_unit}')
+        self.visa.write(self._fmt_set_wav_step(step))
 
+    @cached_query
     def get_wave_sweep_speed(self):
         """
         Returns the wavelength sweep speed in meters per second.
         """
-        speed = self.visa.query_ascii_values(f':sour{self.slot}:wav:swe:spe?')[0]
+        speed = float(self.visa.query(f':sour{self.slot}:wav:swe:spe?'))
         return speed
     
     def set_wave_sweep_speed(self, speed:float):
@@ -227,13 +468,14 @@ class AgilentLaser(AgilentMainframe):
             speed : float
                 Sweep speed in meters per second.
         """
-        self.visa.write(f':sour{self.slot}:wav:swe:spe {speed}m/s')
+        self._cache.pop('get_wave_sweep_speed', None)
+        self.visa.write(self._fmt_set_wav_speed(speed))
 
     def get_wave_sweep_mode(self):
         """
         Returns the sweep mode.
         """
-        mode = self.visa.query_ascii_values(f':sour{self.slot}:wav:swe:mode?')[0]
+        mode = self.visa.query(f':sour{self.slot}:wav:swe:mode?')
         return mode
     
     def set_wave_sweep_mode(self, mode:str):
@@ -249,17 +491,63 @@ class AgilentLaser(AgilentMainframe):
         Raises:
             ValueError: <mode> is an incorrect string.
         """
-        settings = ['step', 'man', 'cont']
-        if mode.lower() not in settings:
+        if mode.lower() not in _SWEEP_MODES:
+            raise ValueError(
+                'Input parameter <mode> not one of the correct strings.')
+        self.visa.write(self._fmt_set_wav_mode(mode))
+
+    def configure_sweep(self, start:float, stop:float, step:float, speed:float, mode='cont'):
+        """
+        Sets the start and stop wavelengths, step size, sweep speed, and sweep
+        mode with a single compound SCPI write.
+
+        Parameters:
+            start : float
+                Start wavelength.
+            stop : float
+                Stop wavelength.
+            step : float
+                Step size.
+            speed : float
+                Sweep speed in meters per second.
+            mode : str, optional
+                Sweep mode, see set_wave_sweep_mode.
+
+        Raises:
+            ValueError: <start> or <stop> is out of range, or <mode> is an incorrect string.
+        """
+        lo, hi = self.min_wl, self.max_wl
+        if not lo <= start <= hi:
+            raise ValueError(
+                f'Input parameter <start> must be between {lo} and {hi}.')
+        if not lo <= stop <= hi:
+            raise ValueError(
+                f'Input parameter <stop> must be between {lo} and {hi}.')
+        if mode.lower() not in _SWEEP_MODES:
             raise ValueError(
                 'Input parameter <mode> not one of the correct strings.')
-        self.visa.write(f':sour{self.slot}:wav:swe:mode {mode}')
+        for name in ('get_wave_sweep_start', 'get_wave_sweep_stop', 'get_wave_sweep_speed'):
+            self._cache.pop(name, None)
+        self.visa.write(';'.join((self._fmt_set_wav_start(start),
+                                  self._fmt_set_wav_stop(stop),
+                                  self._fmt_set_wav_step(step),
+                                  self._fmt_set_wav_speed(speed),
+                                  self._fmt_set_wav_mode(mode))))
         
+    @property
+    def pow_unit(self):
+        """
+        Power unit, read through the get_power_unit() cache so that
+        clear_cache() also forgets it.
+        """
+        return self.get_power_unit()
+
+    @cached_query
     def get_power_unit(self):
         """
         Returns the laser's power unit.
         """
-        unit = self.visa.query_ascii_values(f':sour{self.slot}:pow:unit?')[0]
+        unit = int(self.visa.query(f':sour{self.slot}:pow:unit?'))
         if unit == 0:
             return 'dBm'
         else:
@@ -273,16 +561,16 @@ class AgilentLaser(AgilentMainframe):
             unit : str
                 Either 'dBm' or 'W'.
         """
-        if unit != 'dBm' and unit != 'W':
+        if unit not in _POW_UNITS:
             raise ValueError('Input parameter <unit> must be "dBm" or "W".')
-        self.visa.write(f':sour{self.slot}:pow:unit {unit}')
-        self.pow_unit = unit
+        self.visa.write(self._fmt_set_pow_unit(unit))
+        self._cache['get_power_unit'] = unit
 
     def get_power(self):
         """
         Returns the laser output power in Watts.
         """
-        pow = self.visa.query_ascii_values(f':sour{self.slot}:pow?')[0]
+        pow = float(self.visa.query(self._qry_pow))
         return pow
     
     def set_power(self, pow:float):
@@ -293,13 +581,13 @@ class AgilentLaser(AgilentMainframe):
             pow : float
                 Laser output power.
         """
-        self.visa.write(f'sour{self.slot}:pow {pow}{self.pow_unit}')
+        self.visa.write(self._fmt_set_pow(pow, self.pow_unit))
 
     def get_expected_ntriggers(self):
         """
         Returns the number of expected triggers. The output of this function is necessary for telling a power meter how many times it needs to measure.
         """
-        exp = self.visa.query_ascii_values(f':sour{self.slot}:wav:swe:exp?')[0]
+        exp = int(self.visa.query(f':sour{self.slot}:wav:swe:exp?'))
         return exp
 
     def lambda_logging_off(self):
@@ -315,107 +603,157 @@ class AgilentLaser(AgilentMainframe):
         self.visa.write(f':sour{self.slot}:wav:swe:llog 1')
 
     def get_lambda_log(self):
-        data = self.visa.query_binary_values(f':sour{self.slot}:read:data? llog')
+        """
+        Returns the wavelengths recorded by lambda logging during the last sweep.
+        """
+        with self._binary_mode():
+            data = self.visa.query_binary_values(f':sour{self.slot}:read:data? llog',
+                                                 datatype='d', is_big_endian=False, container=np.ndarray)
         return data
     
     def soft_trigger(self):
         """
         Initiates a software trigger, which functions similarly to a hardware trigger, but does not cause a power meter to take a measurement.
         """
-        self.visa.write(f':sour{self.slot}:wav:swe:soft')
+        self.visa.write(self._cmd_soft_trig)
 
     def get_flag(self):
-        flag = self.visa.query_ascii_values(f':sour{self.slot}:wav:swe:flag?')[0]
-        return flag
+        """
+        Returns the sweep flag. While the flag monitor is running, the flag
+        is only queried after the mainframe has raised a service request;
+        otherwise the last value read is returned and no query is sent.
+
+        Raises:
+            Exception: The error that stopped the flag monitor, if any.
+        """
+        if self._flag_monitor is None:
+            flag = int(self.visa.query(self._qry_flag))
+            return flag
+        err, self._flag_monitor_error = self._flag_monitor_error, None
+        if err is not None:
+            self.disable_flag_monitor()
+            raise err
+        if self._flag_stale.is_set():
+            # Bus I/O stays on the caller's thread; the monitor only waits
+            self._flag_stale.clear()
+            self.visa.read_stb()
+            self._flag = int(self.visa.query(self._qry_flag))
+        return self._flag
+
+    def enable_flag_monitor(self):
+        """
+        Starts a background thread that waits for the mainframe's service
+        requests, so that get_flag() only queries the laser after one has
+        been raised. The status registers must already be set up to request
+        service on the sweep events of interest.
+        """
+        if self._flag_monitor is not None:
+            return
+        self._flag = int(self.visa.query(self._qry_flag))
+        self._flag_monitor_stop.clear()
+        self._flag_stale.clear()
+        self._flag_monitor_error = None
+        self.visa.enable_event(visa.constants.EventType.service_request,
+                               visa.constants.EventMechanism.queue)
+        self._flag_monitor = threading.Thread(target=self._monitor_flag, daemon=True)
+        self._flag_monitor.start()
+
+    def disable_flag_monitor(self):
+        """
+        Stops the flag monitor, after which get_flag() queries the laser again.
+        """
+        if self._flag_monitor is None:
+            return
+        self._flag_monitor_stop.set()
+        self._flag_monitor.join()
+        self._flag_monitor = None
+        self.visa.disable_event(visa.constants.EventType.service_request,
+                                visa.constants.EventMechanism.queue)
+
+    def _monitor_flag(self):
+        try:
+            while not self._flag_monitor_stop.is_set():
+                response = self.visa.wait_on_event(visa.constants.EventType.service_request,
+                                                   1000, capture_timeout=True)
+                if not response.timed_out:
+                    self._flag_stale.set()
+        except Exception as err:
+            # Handed to the caller by the next get_flag()
+            self._flag_monitor_error = err
 
     def output_off(self):
-        self.visa.write(f':sour{self.slot}:pow:stat 0')
+        self.visa.write(self._cmd_output_off)
 
     def output_on(self):
-        self.visa.write(f':sour{self.slot}:pow:stat 1')
+        self.visa.write(self._cmd_output_on)
 
     def stop_sweep(self):
-        self.visa.write(f':sour{self.slot}:wav:swe 0')
+        self.visa.write(self._cmd_sweep_stop)
 
     def start_sweep(self):
-        self.visa.write(f':sour{self.slot}:wav:swe 1')
+        self.visa.write(self._cmd_sweep_start)
 
 class Agilent81689A(AgilentLaser):
     """
     Tunable laser
     """
-    def __init__(self, visa, slot:int):
-        super().__init__(visa, slot)
-        self.module_id = visa.query(f':slot{slot}:idn?')
-        self.module_id = self.module_id.split(',')
-        if self.module_id[0] != 'HEWLETT-PACKARD' or self.module_id[1] != ' HP 81689A':
-            print('Slot module not recognized as HP 81689A.')
-        self.visa = visa
-        self.slot = slot
+    _EXPECTED_MODULE = ('HEWLETT-PACKARD', ' HP 81689A')
 
-        self.min_wl = 1465e-9
-        self.max_wl = 1575e-9
-        self.min_pow_dBm = -10
-        self.max_pow_dBm = 13
-        self.min_pow_mW = 100e-6
-        self.max_pow_mW = 20e-3
+    min_pow_dBm = -10
+    max_pow_dBm = 13
+    min_pow_mW = 100e-6
+    max_pow_mW = 20e-3
 
 class Agilent81600B(AgilentLaser):
     """
     Tunable laser
     """
-    def __init__(self, visa, slot:int):
-        super().__init__(visa, slot)
-        self.module_id = visa.query(f':slot{slot}:idn?')
-        self.module_id = self.module_id.split(',')
-        if self.module_id[0] != 'Agilent Technologies' or self.module_id[1] != '81600B':
-            print('Slot module not recognized as Agilent 81600B.')
-        self.visa = visa
-        self.slot = slot
+    _EXPECTED_MODULE = ('Agilent Technologies', '81600B')
 
-        self.min_wl = 1260e-9
-        self.max_wl = 1640e-9
-        self.min_pow_dBm = -10
-        self.max_pow_dBm = 6
-        self.min_pow_mW = 100e-6
-        self.max_pow_mW = 5e-3
+    min_pow_dBm = -10
+    max_pow_dBm = 6
+    min_pow_mW = 100e-6
+    max_pow_mW = 5e-3
 
 class Agilent81606A(AgilentLaser):
     """
     Tunable laser
     """
-    def __init__(self, visa, slot:int):
-        super().__init__(visa, slot)
-        self.module_id = visa.query(f':slot{slot}:idn?')
-        self.module_id = self.module_id.split(',')
-        if self.module_id[0] != 'HEWLETT-PACKARD' or self.module_id[1] != ' HP 81606A':
-            print('Slot module not recognized as HP 81606A.')
-        self.visa = visa
-        self.slot = slot
-
-        self.min_wl = 1450e-9
-        self.max_wl = 1650e-9
-
+    _EXPECTED_MODULE = ('HEWLETT-PACKARD', ' HP 81606A')
 
 class AgilentPowerMeter(AgilentMainframe):
     """
     Power sensor
     """
+    # Model limits, overridden by subclasses
+    min_wl = None
+    max_wl = None
+
     def __init__(self, visa, slot:int, wl_unit='m'):
-        super().__init__(visa)
-        self.visa = visa
+        super().__init__(visa, slot)
         self.slot = slot
+        self._identify_module(slot)
         self.wl_unit = wl_unit
-        self.pow_unit = self.get_power_unit()
 
-        self.min_wl = None
-        self.max_wl = None
+        # Setter templates, bound once since <slot> and <wl_unit> never change
+        self._fmt_set_wav = f':sens{slot}:pow:wav {{}}{wl_unit}'.format
+        self._fmt_set_pow_unit = f':sens{slot}:pow:unit {{}}'.format
+        self._fmt_set_pow_range = f':sens{slot}:pow:rang {{}}DBM'.format
+        self._fmt_set_logging = f':sens{slot}:func:par:logg {{}},{{}}'.format
 
+        # Hot-path query, built once for the same reason
+        self._qry_wav = f':sens{slot}:pow:wav?'
+
+        # :read triggers and fetches in one go; in continuous mode the sensor
+        # is already measuring, so :fetc alone returns the latest value
+        self._meas_query = f':read{slot}:pow?'
+
+    @cached_query
     def get_wavelength(self):
         """
         Returns the laser wavelength in meters.
         """
-        lam = self.visa.query_ascii_values(f':sens{self.slot}:pow:wav?')[0]
+        lam = float(self.visa.query(self._qry_wav))
         return lam
     
     def set_wavelength(self, lam:float):
@@ -426,16 +764,27 @@ class AgilentPowerMeter(AgilentMainframe):
             lam : float
                 Laser wavelength.
         """
-        if lam < self.min_wl or lam > self.max_wl:
+        lo, hi = self.min_wl, self.max_wl
+        if not lo <= lam <= hi:
             raise ValueError(
-                f'Input parameter <lam> must be between {self.min_wl} and {self.max_wl}.')
-        self.visa.write(f':sens{self.slot}:pow:wav {lam}{self.wl_unit}')
+                f'Input parameter <lam> must be between {lo} and {hi}.')
+        self._cache.pop('get_wavelength', None)
+        self.visa.write(self._fmt_set_wav(lam))
 
+    @property
+    def pow_unit(self):
+        """
+        Power unit, read through the get_power_unit() cache so that
+        clear_cache() also forgets it.
+        """
+        return self.get_power_unit()
+
+    @cached_query
     def get_power_unit(self):
         """
         Returns the power unit.
         """
-        unit = self.visa.query_ascii_values(f'sens{self.slot}:pow:unit?')[0]
+        unit = int(self.visa.query(f'sens{self.slot}:pow:unit?'))
         if unit == 0:
             return 'dBm'
         else:
@@ -449,10 +798,10 @@ class AgilentPowerMeter(AgilentMainframe):
             unit : str
                 Either 'dBm' or 'W'.
         """
-        if unit != 'dBm' and unit != 'W':
+        if unit not in _POW_UNITS:
             raise ValueError('Input parameter <unit> must be "dBm" or "W".')
-        self.visa.write(f':sens{self.slot}:pow:unit {unit}')
-        self.pow_unit = unit
+        self.visa.write(self._fmt_set_pow_unit(unit))
+        self._cache['get_power_unit'] = unit
 
     def disable_auto_range(self):
         self.visa.write(f':sens{self.slot}:pow:rang:auto 0')
@@ -464,27 +813,38 @@ class AgilentPowerMeter(AgilentMainframe):
         """
         Returns the power range in dBm.
         """
-        power = self.visa.query_ascii_values(f':sens{self.slot}:pow:rang?')[0]
+        power = float(self.visa.query(f':sens{self.slot}:pow:rang?'))
         return power
     
     def set_power_range(self, power:float):
         """
         Sets the power range in dBm.
         """
-        power = round(power, -1)
-        if power < -110:
-            power = -110
-        elif power > 30:
-            power = 30
-        self.visa.write(f':sens{self.slot}:pow:rang {power}DBM')
+        power = int((power + 5) // 10) * 10
+        power = -110 if power < -110 else 30 if power > 30 else power
+        self.visa.write(self._fmt_set_pow_range(power))
 
     def measure_power(self):
         """
         Returns the input optical power in dBm.
         """
-        self.visa.write(f':init{self.slot}')
-        pow = self.visa.query_ascii_values(f':read{self.slot}:pow?')[0]
+        pow = float(self.visa.query(self._meas_query))
         return pow
+
+    def enable_continuous(self):
+        """
+        Makes the sensor measure continuously, so measure_power() only fetches
+        the latest value instead of triggering a new measurement.
+        """
+        self.visa.write(f':init{self.slot}:cont 1')
+        self._meas_query = f':fetc{self.slot}:pow?'
+
+    def disable_continuous(self):
+        """
+        Stops continuous measurement; measure_power() triggers each reading.
+        """
+        self.visa.write(f':init{self.slot}:cont 0')
+        self._meas_query = f':read{self.slot}:pow?'
     
     def get_status(self):
         """
@@ -498,7 +858,7 @@ class AgilentPowerMeter(AgilentMainframe):
                 PROGRESS
                 COMPLETE
         """
-        stat = self.visa.query_ascii_values(f'sens{self.slot}:func:stat?', converter='s')[0]
+        stat = self.visa.query(f'sens{self.slot}:func:stat?')
         return stat
     
     def get_logging(self):
@@ -514,11 +874,24 @@ class AgilentPowerMeter(AgilentMainframe):
         """
         Sets the number of expected data points and the averaging time (in seconds) for logging data acquisition.
         """
-        self.visa.write(f':sens{self.slot}:func:par:logg {num_samples},{avg_time}')
+        self.visa.write(self._fmt_set_logging(num_samples, avg_time))
 
     def start_logging(self):
         self.visa.write(f':sens{self.slot}:func:stat logg,star')
 
+    def log_sweep(self, num_samples:int, avg_time:float):
+        """
+        Sets the logging parameters and starts logging with a single compound
+        SCPI write. Read the samples with get_data() once logging completes.
+
+        Parameters:
+            num_samples : int
+                Number of expected data points.
+            avg_time : float
+                Averaging time per point in seconds.
+        """
+        self.visa.write(f'{self._fmt_set_logging(num_samples, avg_time)};:sens{self.slot}:func:stat logg,star')
+
     def stop_logging(self):
         self.visa.write(f':sens{self.slot}:func:stat logg,stop')
 
@@ -526,40 +899,28 @@ class AgilentPowerMeter(AgilentMainframe):
         """
         Returns the collected data after logging has been completed.
         """
-        data = self.visa.query_binary_values(f':sens{self.slot}:func:res?')
+        with self._binary_mode():
+            data = self.visa.query_binary_values(f':sens{self.slot}:func:res?',
+                                                 datatype='f', is_big_endian=False, container=np.ndarray)
         return data
     
 class Agilent81634B(AgilentPowerMeter):
     """
     Power sensor
     """
-    def __init__(self, visa, slot:int):
-        super().__init__(visa, slot)
-        self.module_id = visa.query(f':slot{slot}:idn?')
-        self.module_id = self.module_id.split(',')
-        if self.module_id[0] != 'Agilent Technologies' or self.module_id[1] != '81634B':
-            print('Slot module not recognized as Agilent 81634B.')
-        self.visa = visa
-        self.slot = slot
+    _EXPECTED_MODULE = ('Agilent Technologies', '81634B')
 
-        self.min_wl = 800e-9
-        self.max_wl = 1700e-9
+    min_wl = 800e-9
+    max_wl = 1700e-9
 
 class Agilent81636B(AgilentPowerMeter):
     """
     Power sensor
     """
-    def __init__(self, visa, slot:int):
-        super().__init__(visa, slot)
-        self.module_id = visa.query(f':slot{slot}:idn?')
-        self.module_id = self.module_id.split(',')
-        if self.module_id[0] != 'Agilent Technologies' or self.module_id[1] != '81636B':
-            print('Slot module not recognized as Agilent 81636B.')
-        self.visa = visa
-        self.slot = slot
+    _EXPECTED_MODULE = ('Agilent Technologies', '81636B')
 
-        self.min_wl = 1250e-9
-        self.max_wl = 1640e-9
+    min_wl = 1250e-9
+    max_wl = 1640e-9
 
 # class Keysight81595B(Keysight8164B):
 #     """
@@ -4,12 +4,14 @@ Author(s): Howard Dao
 """
 
 import pyvisa as visa
-import numpy as np
 
 class HPAttenuator(visa.resources.GPIBInstrument):
     def __init__(self, visa):
-        self.idn = visa.query('*IDN?')
-        self.idn = self.idn.split(',')
+        visa.chunk_size = 1 << 16
+        visa.write_termination = '\n'
+        visa.read_termination = '\n'
+        visa.send_end = True
+        self.idn = tuple(visa.query('*IDN?').split(',', 3))
         if self.idn[0] != 'HEWLETT-PACKARD':
             print('Device not recognized as a Hewlett-Packard device.')
         self.visa = visa
@@ -19,12 +21,40 @@ class HPAttenuator(visa.resources.GPIBInstrument):
 
         self.min_wl = None
         self.max_wl = None
+
+        # Last read values, dropped by the matching setter since the
+        # instrument may round or clamp what was written
+        self._cache = {}
+
+    def clear_cache(self):
+        """
+        Forgets all cached values, so the next reads query the instrument.
+        """
+        self._cache.clear()
+
+    def refresh(self):
+        """
+        Rereads the attenuation and wavelength with one compound query, e.g.
+        after they were changed from the front panel.
+
+        Returns:
+            float : Attenuation in dB.
+            float : Wavelength in meters.
+        """
+        att, lam = self.visa.query(':inp:att?;:inp:wav?').split(';')
+        self._cache['att'] = att = float(att)
+        self._cache['wav'] = lam = float(lam)
+        return att, lam
     
     def get_attenuation(self):
         """
         Returns the attenuation.
         """
-        return self.visa.query_ascii_values(':inp:att?')[0]
+        try:
+            return self._cache['att']
+        except KeyError:
+            att = self._cache['att'] = float(self.visa.query(':inp:att?'))
+            return att
     
     def set_attenuation(self, att:float):
         """
@@ -37,15 +67,17 @@ class HPAttenuator(visa.resources.GPIBInstrument):
         Raises:
             ValueError: <att> is out of range.
         """
-        if att < self.min_att or att > self.max_att:
-            raise ValueError(f'Input parameter <att> must be between {self.min_att} and {self.max_att}, given {att}.')
+        lo, hi = self.min_att, self.max_att
+        if not lo <= att <= hi:
+            raise ValueError(f'Input parameter <att> must be between {lo} and {hi}, given {att}.')
+        self._cache.pop('att', None)
         self.visa.write(f':inp:att {att}')
 
     # def get_output_power(self):
     #     """
     #     Returns the through-power that is used to set the filter attenuation.
     #     """
-    #     return self.visa.query_ascii_values(':outp:pow?')[0]
+    #     return float(self.visa.query(':outp:pow?'))
     
     # def set_output_power(self, power:float):
     #     """
@@ -61,7 +93,11 @@ class HPAttenuator(visa.resources.GPIBInstrument):
         """
         Returns the wavelength.
         """
-        return self.visa.query_ascii_values(':inp:wav?')[0]
+        try:
+            return self._cache['wav']
+        except KeyError:
+            lam = self._cache['wav'] = float(self.visa.query(':inp:wav?'))
+            return lam
     
     def set_wavelength(self, lam:float):
         """
@@ -74,8 +110,10 @@ class HPAttenuator(visa.resources.GPIBInstrument):
         Raises:
             ValueError: <lam> is out of range.
         """
-        if lam < self.min_wl or lam > self.max_wl:
-            raise ValueError(f'Input parameter <lam> must be between {self.min_wl} and {self.max_wl}, given {lam}.')
+        lo, hi = self.min_wl, self.max_wl
+        if not lo <= lam <= hi:
+            raise ValueError(f'Input parameter <lam> must be between {lo} and {hi}, given {lam}.')
+        self._cache.pop('wav', None)
         self.visa.write(f':inp:wav {lam}')
 
     def output_off(self):
@@ -89,7 +127,6 @@ class HP8156A(HPAttenuator):
         super().__init__(visa)
         if self.idn[1] != 'HP8156A':
             print(f'{self.idn[0]} device not recognized as HP8156A.')
-            self.visa = visa
 
         self.min_att = 0
         self.max_att = 60
@@ -6,25 +6,43 @@ Author(s): Howard Dao
 import pyvisa as visa
 
 class N7744A(visa.resources.GPIBInstrument):
+    # Power unit -> :sens:pow:unit code
+    _UNIT_CODE = {'dBm': 0, 'W': 1}
+
     def __init__(self, visa):
-        self.idn = visa.query('*IDN?')
-        self.idn = self.idn.split(',')
+        visa.chunk_size = 1 << 16
+        visa.write_termination = '\n'
+        visa.read_termination = '\n'
+        visa.send_end = True
+        self.idn = tuple(visa.query('*IDN?').split(',', 3))
         if self.idn[0] != 'Keysight Technologies' or self.idn[1] != 'N7744A':
             print('Device not recognized as Keysight Keysight N7744A.')
         self.visa = visa
 
         self.min_wl = 1250e-9
         self.max_wl = 1650e-9
+
+        # Last read values, dropped by the matching setter
+        self._cache = {}
+
+    def clear_cache(self):
+        """
+        Forgets all cached values, so the next reads query the instrument.
+        """
+        self._cache.clear()
     
     def get_wavelength(self, ch:int):
         """
         Returns the wavelength of a specified channel.
         """
         if ch in range(1,5):
-            lam = self.visa.query_ascii_values(f':sens{ch}:pow:wav?')[0]
-            return lam
+            try:
+                return self._cache['wav', ch]
+            except KeyError:
+                lam = self._cache['wav', ch] = float(self.visa.query(f':sens{ch}:pow:wav?'))
+                return lam
         else:
-            return ValueError('Input parameter <ch> must be 1, 2, 3, or 4.')
+            raise ValueError('Input parameter <ch> must be 1, 2, 3, or 4.')
     
     def set_wavelength(self, lam:float, ch:int):
         """
@@ -41,12 +59,13 @@ class N7744A(visa.resources.GPIBInstrument):
         """
         if ch in range(1,5):
             if lam >= self.min_wl and lam <= self.max_wl:
+                self._cache.pop(('wav', ch), None)
                 self.visa.write(f':sens{ch}:pow:wav {lam}')
             else:
-                return ValueError(f'Input parameter <lam> must be between 
-                                  {self.min_wl} and {self.max_wl}.')
+                raise ValueError(
+                    f'Input parameter <lam> must be between {self.min_wl} and {self.max_wl}.')
         else:
-            return ValueError('Input parameter <ch> must be 1, 2, 3, or 4.')
+            raise ValueError('Input parameter <ch> must be 1, 2, 3, or 4.')
     
     def get_power_unit(self, verbose=True):
         """
@@ -58,7 +77,10 @@ class N7744A(visa.resources.GPIBInstrument):
         Returns:
             str : Optical power unit.
         """
-        unit = self.visa.query_ascii_values(':sens:pow:unit?')[0]
+        try:
+            unit = self._cache['unit']
+        except KeyError:
+            unit = self._cache['unit'] = int(self.visa.query(':sens:pow:unit?'))
         if verbose:
             if unit == 1:
                 return 'W'
@@ -78,13 +100,11 @@ class N7744A(visa.resources.GPIBInstrument):
         Raises:
             ValueError: <unit> is neither 'W' or 'dBm'.
         """
-        if unit == 'dBm':
-            unit = 0
-        elif unit == 'W':
-            unit = 1
-        else:
-            raise ValueError('Input paramter <unit> must be "dBm" or "W".')
-        self.visa.write(':sens:pow:unit ', unit)
+        code = self._UNIT_CODE.get(unit)
+        if code is None:
+            raise ValueError('Input parameter <unit> must be "dBm" or "W".')
+        self._cache.pop('unit', None)
+        self.visa.write(f':sens:pow:unit {code}')
         
     def meas_power(self, ch:int):
         """
@@ -98,7 +118,18 @@ class N7744A(visa.resources.GPIBInstrument):
             ValueError: <ch> is neither 1, 2, 3, or 4.
         """
         if ch in range(1,5):
-            power = self.visa.query_ascii_values(f':read{ch}:pow?')[0]
+            power = float(self.visa.query(f':read{ch}:pow?'))
             return power
         else:
-            raise ValueError('Input parameter <ch> must be 1, 2, 3, or 4.')
\ No newline at end of file
+            raise ValueError('Input parameter <ch> must be 1, 2, 3, or 4.')
+
+    def meas_power_all_channels(self):
+        """
+        Returns the measured optical power from all four channels, read with
+        one compound query.
+
+        Returns:
+            list : Optical power of channels 1 to 4.
+        """
+        powers = self.visa.query(':read1:pow?;:read2:pow?;:read3:pow?;:read4:pow?')
+        return [float(power) for power in powers.split(';')]
\ No newline at end of file
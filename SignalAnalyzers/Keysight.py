@@ -8,20 +8,35 @@ import numpy as np
 
 class KeysightSA(visa.resources.GPIBInstrument):
     def __init__(self, visa):
-        self.idn = visa.query('*IDN?')
-        self.idn = self.idn.split(',')
+        visa.chunk_size = 1 << 20
+        visa.write_termination = '\n'
+        visa.read_termination = '\n'
+        visa.send_end = True
+        self.idn = tuple(visa.query('*IDN?').split(',', 3))
         if self.idn[0] != 'Agilent Technologies':
             print('Device not recognized as a Keysight device.')
         self.visa = visa
+        # Traces are always transferred as little-endian float32
+        self.visa.write(':form:data real,32;:form:bord swap')
 
         self.min_freq = None
         self.max_freq = None
 
+        # Last read (start, stop) frequencies, dropped by any setter that moves them
+        self._freq_range = None
+
+    def clear_cache(self):
+        """
+        Forgets all cached values, so the next reads query the instrument,
+        e.g. after settings were changed from the front panel.
+        """
+        self._freq_range = None
+
     def get_center_freq(self):
         """
         Returns the center frequency.
         """
-        return self.visa.query_ascii_values(':freq:cent?')[0]
+        return float(self.visa.query(':freq:cent?'))
     
     def set_center_freq(self, freq:float):
         """
@@ -31,15 +46,17 @@ class KeysightSA(visa.resources.GPIBInstrument):
             freq : float
                 Frequency in Hz.
         """
-        if freq < self.min_freq or freq > self.max_freq:
-            raise ValueError(f'Input parameter <freq> must between {self.min_freq} and {self.max_freq}, given {freq}.')
+        lo, hi = self.min_freq, self.max_freq
+        if not lo <= freq <= hi:
+            raise ValueError(f'Input parameter <freq> must between {lo} and {hi}, given {freq}.')
+        self._freq_range = None
         self.visa.write(f':freq:cent {freq}Hz')
 
     def get_freq_span(self):
         """
         Returns the frequency span.
         """
-        return self.visa.query_ascii_values(':freq:span?')[0]
+        return float(self.visa.query(':freq:span?'))
     
     def set_freq_span(self, span:float):
         """
@@ -49,13 +66,14 @@ class KeysightSA(visa.resources.GPIBInstrument):
             span : float
                 Frequency span in Hz.
         """
+        self._freq_range = None
         self.visa.write(f':freq:span {span}Hz')
 
     def get_freq_start(self):
         """
         Returns the start frequency.
         """
-        return self.visa.query_ascii_values(':freq:start?')[0]
+        return float(self.visa.query(':freq:start?'))
     
     def set_freq_start(self, freq:float):
         """
@@ -65,15 +83,17 @@ class KeysightSA(visa.resources.GPIBInstrument):
             freq : float
                 Start frequency in Hz.
         """
-        if freq < self.min_freq or freq > self.max_freq:
-            raise ValueError(f'Input parameter <freq> must between {self.min_freq} and {self.max_freq}, given {freq}.')
+        lo, hi = self.min_freq, self.max_freq
+        if not lo <= freq <= hi:
+            raise ValueError(f'Input parameter <freq> must between {lo} and {hi}, given {freq}.')
+        self._freq_range = None
         self.visa.write(f':freq:start {freq}Hz')
     
     def get_freq_stop(self):
         """
         Returns the stop frequency.
         """
-        return self.visa.query_ascii_values(':freq:stop?')[0]
+        return float(self.visa.query(':freq:stop?'))
     
     def set_freq_stop(self, freq:float):
         """
@@ -83,15 +103,17 @@ class KeysightSA(visa.resources.GPIBInstrument):
             freq : float
                 Stop frequency in Hz.
         """
-        if freq < self.min_freq or freq > self.max_freq:
-            raise ValueError(f'Input parameter <freq> must between {self.min_freq} and {self.max_freq}, given {freq}.')
+        lo, hi = self.min_freq, self.max_freq
+        if not lo <= freq <= hi:
+            raise ValueError(f'Input parameter <freq> must between {lo} and {hi}, given {freq}.')
+        self._freq_range = None
         self.visa.write(f':freq:stop {freq}Hz')
 
     def get_res_bw(self):
         """
         Returns resolution bandwidth.
         """
-        return self.visa.query_ascii_values(':band?')[0]
+        return float(self.visa.query(':band?'))
     
     def set_res_bw(self, freq:float):
         """
@@ -118,20 +140,21 @@ class KeysightSA(visa.resources.GPIBInstrument):
             ndarray : Frequencies
             ndarray : Trace
         """
-        self.visa.write(':form:data real,32')
-
-        # Set byte order to little endian
-        byte_order = self.visa.query_ascii_values(':form:bord?', converter='s')[0].rstrip()
-        if byte_order == 'NORM':
-            self.visa.write(':form:bord swap')
-
-        # Acquire trace
-        trace = self.visa.query_binary_values(':trace:data? trace1', datatype='f', is_big_endian=False)
-        trace_arr = np.asarray(trace)
-
-        # Calculate frequencies
-        f1 = self.get_freq_start()
-        f2 = self.get_freq_stop()
+        # Acquire trace with the read termination off, so that binary bytes
+        # matching it do not split the block into several reads
+        read_termination = self.visa.read_termination
+        self.visa.read_termination = None
+        try:
+            trace_arr = self.visa.query_binary_values(':trace:data? trace1', datatype='f', is_big_endian=False,
+                                                      container=np.ndarray)
+        finally:
+            self.visa.read_termination = read_termination
+
+        # Calculate frequencies, querying start and stop together when not cached
+        if self._freq_range is None:
+            f1, f2 = self.visa.query(':freq:start?;:freq:stop?').split(';')
+            self._freq_range = (float(f1), float(f2))
+        f1, f2 = self._freq_range
         freq = np.linspace(f1, f2, len(trace_arr))
 
         return freq, trace_arr
@@ -142,7 +165,6 @@ class N9010A(KeysightSA):
         super().__init__(visa)
         if self.idn[1] != 'N9010A':
             print(f'{self.idn[0]} device not recognized as N9010A.')
-        self.visa = visa
 
         self.min_freq = 10
         self.max_freq = 44e9
\ No newline at end of file
@@ -7,17 +7,62 @@ import pyvisa as visa
 import numpy as np
 
 class KeithleySourceMeter(visa.resources.GPIBInstrument):
-    def __init__(self, visa):
-        self.idn = visa.query('*IDN?')
-        self.idn = self.idn.split(',')
-        if self.idn[0] != 'KEITHLEY INSTRUMENTS INC.':
-            print('Device not recognized as a Keithley device.')
+    # Model limits, overridden by subclasses
+    min_volt = None
+    max_volt = None
+    min_curr = None
+    max_curr = None
+
+    # Setter templates, bound once at class creation
+    _fmt_set_volt = ':source:volt {}'.format
+    _fmt_set_curr = ':source:curr {}'.format
+
+    def __init__(self, visa, verify_idn=True):
+        visa.chunk_size = 1 << 20
+        visa.write_termination = '\n'
+        visa.read_termination = '\n'
+        visa.send_end = True
+        visa.timeout = 30000
+        # With <verify_idn> False the *IDN? round-trip is skipped and idn is None
+        self.idn = None
+        if verify_idn:
+            self.idn = tuple(visa.query('*IDN?').split(',', 3))
+            if self.idn[0] != 'KEITHLEY INSTRUMENTS INC.':
+                print('Device not recognized as a Keithley device.')
         self.visa = visa
 
-        self.min_volt = None
-        self.max_volt = None
-        self.min_curr = None
-        self.max_curr = None
+        # Source mode -> (compliance measure type, lower limit, upper limit, error message)
+        self._compliance = {
+            'VOLT': ('curr', self.min_curr, self.max_curr, 'Outputting voltage, current compliance must be between {} and {} A.'),
+            'CURR': ('volt', self.min_volt, self.max_volt, 'Outputting current, voltage compliance must be between {} and {} V.'),
+        }
+
+        # Last :read? reply, dropped whenever the source changes
+        self._last_meas = None
+        # Source ('volt' or 'curr') left in list mode by set_volt_list/set_curr_list
+        self._list_src = None
+        # Source mode as reported by the sourcemeter, kept by set_source_mode
+        self._cached_mode = None
+        # Compliance limits by measure type ('volt' or 'curr'), last read or written
+        self._cache = {}
+
+    def clear_cache(self):
+        """
+        Forgets all cached values, so the next reads query the instrument,
+        e.g. after settings were changed from the front panel.
+        """
+        self._cache.clear()
+        self._cached_mode = None
+
+    def set_io_timeout(self, ms:int):
+        """
+        Sets how long a read waits for the instrument before timing out.
+
+        Parameters:
+            ms : int
+                Timeout in milliseconds.
+        """
+        self.visa.timeout = ms
 
     def get_source_mode(self):
         """
@@ -27,9 +72,22 @@ class KeithleySourceMeter(visa.resources.GPIBInstrument):
             mode : str
                 Either 'volt' or 'curr'.
         """
-        mode = self.visa.query_ascii_values(':source:func:mode?', converter='s')[0]
-        mode = mode.rstrip('\n')
+        mode = self._cached_mode
+        if mode is None:
+            mode = self._cached_mode = self.visa.query(':source:func:mode?').rstrip('\n')
         return mode
+
+    def refresh_mode(self):
+        """
+        Forgets the cached source mode and queries it again, e.g. after it was
+        changed from the front panel.
+
+        Returns:
+            mode : str
+                Either 'volt' or 'curr'.
+        """
+        self._cached_mode = None
+        return self.get_source_mode()
     
     def set_source_mode(self, mode:str):
         """
@@ -46,7 +104,9 @@ class KeithleySourceMeter(visa.resources.GPIBInstrument):
         if mode.lower() not in settings:
             raise ValueError(
                 'Input parameter <mode> must be either "volt" or "curr".')
+        self._last_meas = None
         self.visa.write(f':source:func:mode {mode}')
+        self._cached_mode = mode.upper()
         
     def set_volt(self, volt:float):
         """
@@ -62,7 +122,10 @@ class KeithleySourceMeter(visa.resources.GPIBInstrument):
         if volt < self.min_volt or volt > self.max_volt:
             raise ValueError(
                 f'Input parameter <volt> must be between {self.min_volt} and {self.max_volt}.')
-        self.visa.write(f':source:volt {volt}')
+        self._last_meas = None
+        self.visa.write(self._leave_list('volt') + self._fmt_set_volt(volt))
+        if self._list_src == 'volt':
+            self._list_src = None
         
     def set_curr(self, curr:float):
         """
@@ -78,8 +141,72 @@ class KeithleySourceMeter(visa.resources.GPIBInstrument):
         if curr < self.min_curr or curr > self.max_curr:
             raise ValueError(
                 f'Input parameter <curr> must be between {self.min_curr} and {self.max_curr}.')
-        self.visa.write(f':source:curr {curr}')
+        self._last_meas = None
+        self.visa.write(self._leave_list('curr') + self._fmt_set_curr(curr))
+        if self._list_src == 'curr':
+            self._list_src = None
     
+    def _set_list(self, src:str, values, lo:float, hi:float, unit:str):
+        """
+        Validates <values> against [<lo>, <hi>] in one pass and loads them as
+        the <src> ('volt' or 'curr') list sweep with a single compound write.
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if not 0 < values.size <= 100:
+            raise ValueError(
+                f'Input parameter <values> must hold between 1 and 100 points, given {values.size}.')
+        if values.min() < lo or values.max() > hi:
+            raise ValueError(
+                f'Input parameter <values> must be between {lo} and {hi} {unit}.')
+        self._last_meas = None
+        points = ','.join(map(str, values.tolist()))
+        self.visa.write(f':source:{src}:mode list;:source:list:{src} {points};:trig:coun {values.size}')
+        self._list_src = src
+
+    def _leave_list(self, src:str):
+        """
+        Returns the commands that put <src> back to a fixed level with one
+        point per trigger if a list sweep left it in list mode, else ''.
+        Any trigger count set for fixed-level measurements is kept otherwise.
+        """
+        if self._list_src != src:
+            return ''
+        return f':source:{src}:mode fix;:trig:coun 1;'
+
+    def set_volt_list(self, values):
+        """
+        Loads a list of output voltages that the sourcemeter steps through by
+        itself, one point per trigger, on the next measurement. meas_all()
+        then returns the readings of every point one after another, and the
+        meas_* methods only the first point's. set_volt() or
+        configure_source() returns to a fixed output level.
+
+        Parameters:
+            values : array-like
+                Up to 100 output voltages in Volts.
+
+        Raises:
+            ValueError: <values> is empty, too long, or out of range.
+        """
+        self._set_list('volt', values, self.min_volt, self.max_volt, 'V')
+
+    def set_curr_list(self, values):
+        """
+        Loads a list of output currents that the sourcemeter steps through by
+        itself, one point per trigger, on the next measurement. meas_all()
+        then returns the readings of every point one after another, and the
+        meas_* methods only the first point's. set_curr() or
+        configure_source() returns to a fixed output level.
+
+        Parameters:
+            values : array-like
+                Up to 100 output currents in Amperes.
+
+        Raises:
+            ValueError: <values> is empty, too long, or out of range.
+        """
+        self._set_list('curr', values, self.min_curr, self.max_curr, 'A')
+
     def get_clamp_limit(self):
         """
         Returns the compliance limit over which the output current/voltage cannot exceed. Limit will be a current limit if outputting voltage, or voltage limit if outputting current.
@@ -88,13 +215,12 @@ class KeithleySourceMeter(visa.resources.GPIBInstrument):
             limit : float
                 Compliance limit. If the sourcemeter is set to outputting voltage, this will be a current limit. If set to outputting current, it will be a voltage limit.
         """
-        mode = self.get_source_mode()
-        if mode == 'VOLT':
-            meas_type = 'curr'
-        else:
-            meas_type = 'volt'
-        limit = self.visa.query_ascii_values(f':{meas_type}:prot:level?')[0]
-        return limit
+        meas_type = self._compliance[self.get_source_mode()][0]
+        try:
+            return self._cache[meas_type]
+        except KeyError:
+            limit = self._cache[meas_type] = float(self.visa.query(f':{meas_type}:prot:level?'))
+            return limit
     
     def set_clamp_limit(self, limit:float):
         """
@@ -110,91 +236,245 @@ class KeithleySourceMeter(visa.resources.GPIBInstrument):
         Raises:
             ValueError: <limit> is out of range.
         """
-        mode = self.get_source_mode()
-        if mode == 'VOLT':
+        meas_type, lo, hi, msg = self._compliance[self.get_source_mode()]
+        if not lo <= limit <= hi:
+            raise ValueError(msg.format(lo, hi))
+        self.visa.write(f':{meas_type}:prot {limit}')
+        self._cache[meas_type] = float(limit)
+
+    def _source_cmd(self, mode:str, level:float, compliance:float):
+        """
+        Validates a source setup and returns the compound command that applies
+        it, with the lower-case mode and the compliance measure type.
+        """
+        mode = mode.lower()
+        if mode == 'volt':
             meas_type = 'curr'
-            if limit < self.min_curr and limit > self.max_curr:
-                raise ValueError(
-                    f'Outputting voltage, current compliance must be between {self.min_curr} and {self.max_curr} A.')
-        else:
+            level_lo, level_hi, level_unit = self.min_volt, self.max_volt, 'V'
+            lim_lo, lim_hi, lim_unit = self.min_curr, self.max_curr, 'A'
+        elif mode == 'curr':
             meas_type = 'volt'
-            if limit < self.min_volt and limit > self.max_volt:
-                raise ValueError(
-                    f'Outputting current, voltage compliance must be between {self.min_volt} and {self.max_volt} V.')
-        self.visa.write(f':{meas_type}:prot {limit}')
+            level_lo, level_hi, level_unit = self.min_curr, self.max_curr, 'A'
+            lim_lo, lim_hi, lim_unit = self.min_volt, self.max_volt, 'V'
+        else:
+            raise ValueError(
+                'Input parameter <mode> must be either "volt" or "curr".')
+        if not level_lo <= level <= level_hi:
+            raise ValueError(
+                f'Input parameter <level> must be between {level_lo} and {level_hi} {level_unit}.')
+        if not lim_lo <= compliance <= lim_hi:
+            raise ValueError(
+                f'Input parameter <compliance> must be between {lim_lo} and {lim_hi} {lim_unit}.')
+        cmd = f':source:func:mode {mode};:source:{mode} {level};:{meas_type}:prot {compliance}'
+        return cmd, mode, meas_type
+
+    def configure_source(self, mode:str, level:float, compliance:float):
+        """
+        Sets the source mode, output level, and compliance limit with a single
+        compound SCPI write.
+
+        Parameters:
+            mode : str
+                Either 'volt' or 'curr'.
+            level : float
+                Output voltage in Volts or current in Amperes, depending on <mode>.
+            compliance : float
+                Current limit in Amperes if <mode> is 'volt', voltage limit in Volts if 'curr'.
+
+        Raises:
+            ValueError: <mode> is neither 'volt' nor 'curr', or <level> or <compliance> is out of range.
+        """
+        cmd, mode, meas_type = self._source_cmd(mode, level, compliance)
+        self._last_meas = None
+        if self._list_src is not None:
+            cmd = self._leave_list(self._list_src) + cmd
+        self.visa.write(cmd)
+        self._list_src = None
+        self._cached_mode = mode.upper()
+        self._cache[meas_type] = float(compliance)
+
+    def configure(self, mode:str, level:float, compliance:float, nplc=1, output=False):
+        """
+        Resets the sourcemeter and sets it up for a measurement with a single
+        compound SCPI write: source mode, output level, compliance limit,
+        integration time of the compliance measurement, and output state.
+
+        Parameters:
+            mode : str
+                Either 'volt' or 'curr'.
+            level : float
+                Output voltage in Volts or current in Amperes, depending on <mode>.
+            compliance : float
+                Current limit in Amperes if <mode> is 'volt', voltage limit in Volts if 'curr'.
+            nplc : float, optional
+                Integration time in power line cycles, between 0.01 and 10.
+            output : bool, optional
+                Whether to turn the output on.
+
+        Raises:
+            ValueError: <mode> is neither 'volt' nor 'curr', or <level>, <compliance>, or <nplc> is out of range.
+        """
+        cmd, mode, meas_type = self._source_cmd(mode, level, compliance)
+        if not 0.01 <= nplc <= 10:
+            raise ValueError(
+                f'Input parameter <nplc> must be between 0.01 and 10, given {nplc}.')
+        self.clear_cache()
+        self._last_meas = None
+        self.visa.write(f'*rst;*cls;{cmd};:sens:{meas_type}:nplc {nplc};:output {int(bool(output))}')
+        self._list_src = None
+        self._cached_mode = mode.upper()
+        self._cache[meas_type] = float(compliance)
 
     def reset_clamp(self):
         """
         Reverts the compliance limit to its default value.
         """
-        mode = self.get_source_mode()
-        if mode == 'VOLT':
-            meas_type = 'curr'
-        else:
-            meas_type = 'volt'
+        meas_type = self._compliance[self.get_source_mode()][0]
+        self._cache.pop(meas_type, None)
         self.visa.write(f':{meas_type}:prot def')
 
     def is_output_on(self):
         """
         Returns True if the sourcemeter is outputting and False otherwise.
         """
-        state = self.visa.query_ascii_values(':output?')[0]
-        if state == 1:
-            return True
-        else:
-            return False
+        return self.visa.query(':output?') == '1'
     
     def output_on(self):
+        self._last_meas = None
         self.visa.write(':output 1')
 
     def output_off(self):
+        self._last_meas = None
         self.visa.write(':output 0')
 
+    def arm_measurement_srq(self, mask=32):
+        """
+        Makes the sourcemeter request service when a measurement event occurs,
+        and queues service requests on the session for wait_for_measurement().
+
+        Parameters:
+            mask : int, optional
+                Measurement event register enable mask (32, reading available, by default).
+        """
+        self.visa.write(f'*cls;:stat:meas:enab {mask};*sre 1')
+        self.visa.enable_event(visa.constants.EventType.service_request,
+                               visa.constants.EventMechanism.queue)
+
+    def disarm_measurement_srq(self):
+        """
+        Stops measurement service requests and queuing them on the session.
+        """
+        self.visa.write('*sre 0')
+        self.visa.disable_event(visa.constants.EventType.service_request,
+                                visa.constants.EventMechanism.queue)
+
+    def initiate(self):
+        """
+        Starts a measurement without reading it, for use with wait_for_measurement().
+        """
+        self._last_meas = None
+        self.visa.write(':init')
+
+    def wait_for_measurement(self, timeout_ms=10000):
+        """
+        Blocks until the sourcemeter requests service, then fetches the
+        readings once, instead of polling over GPIB. Requires
+        arm_measurement_srq() and a measurement started with initiate().
+        The measurement event register is read to clear it, so the next
+        measurement raises a new service request.
+
+        Parameters:
+            timeout_ms : int, optional
+                Maximum time to wait in milliseconds (10000 by default).
+
+        Returns:
+            meas : tuple
+                Readings, in the same order as meas_all().
+
+        Raises:
+            pyvisa.errors.VisaIOError: No service request within <timeout_ms>.
+        """
+        self.visa.wait_on_event(visa.constants.EventType.service_request, timeout_ms)
+        self.visa.read_stb()
+        self.visa.query(':stat:meas?')
+        meas = self._last_meas = self.visa.query_ascii_values(':fetc?', container=tuple)
+        return meas
+
     def meas_all(self):
-        meas = self.visa.query_ascii_values(':read?')
+        """
+        Triggers one measurement and returns every reading it produced.
+
+        Returns:
+            meas : tuple
+                Voltage, current, and resistance readings, followed by any
+                further fields the sourcemeter reports. After a list sweep
+                is loaded, these fields repeat once per list point.
+        """
+        meas = self._last_meas = self.visa.query_ascii_values(':read?', container=tuple)
         return meas
+
+    def _measure(self, idx:int, fresh:bool):
+        """
+        Returns field <idx> of a new measurement, or of the last one if
+        <fresh> is False and the source has not changed since.
+        """
+        meas = self._last_meas
+        if fresh or meas is None:
+            meas = self.meas_all()
+        return meas[idx]
     
-    def meas_volt(self):
+    def meas_volt(self, fresh=True):
         """
         Measures the voltage reading in Volts.
 
+        Parameters:
+            fresh : bool, optional
+                Whether to trigger a new measurement (True) or reuse the last
+                one taken since the source last changed (False).
+
         Returns:
             volt : float
                 Voltage reading in Volts.
         """
-        volt = self.visa.query_ascii_values(':read?')[0]
-        return volt
+        return self._measure(0, fresh)
     
-    def meas_curr(self):
+    def meas_curr(self, fresh=True):
         """
         Measures the current reading in Amperes.
 
+        Parameters:
+            fresh : bool, optional
+                Whether to trigger a new measurement (True) or reuse the last
+                one taken since the source last changed (False).
+
         Returns:
             curr : float
                 Current reading in Amperes.
         """
-        curr = self.visa.query_ascii_values(':read?')[1]
-        return curr
+        return self._measure(1, fresh)
     
-    def meas_res(self):
+    def meas_res(self, fresh=True):
         """
         Measures the resistance in Ohms.
 
+        Parameters:
+            fresh : bool, optional
+                Whether to trigger a new measurement (True) or reuse the last
+                one taken since the source last changed (False).
+
         Returns:
             res : float
                 Resistance reading in Ohms.
         """
-        res = self.visa.query_ascii_values(':read?')[2]
-        return res
+        return self._measure(2, fresh)
     
 class Keithley2420(KeithleySourceMeter):
-    def __init__(self, visa):
-        super().__init__(visa)
-        if self.idn[1] != 'MODEL 2420':
-            print(f'{self.idn[0]} device not recognized as Model 2420.')
-        self.visa = visa
+    min_volt = -63
+    max_volt = 63
+    min_curr = -3.15
+    max_curr = 3.15
 
-        self.min_volt = -63
-        self.max_volt = 63
-        self.min_curr = -3.15
-        self.max_curr = 3.15
\ No newline at end of file
+    def __init__(self, visa, verify_idn=True):
+        super().__init__(visa, verify_idn)
+        if self.idn is not None and self.idn[1] != 'MODEL 2420':
+            print(f'{self.idn[0]} device not recognized as Model 2420.')
\ No newline at end of file
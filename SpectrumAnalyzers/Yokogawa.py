@@ -3,21 +3,73 @@ Python wrapper for Yokogawa Optical Spectrum Analyzers
 Author(s): Howard Dao
 """
 
+import time
+import warnings
+from collections import namedtuple
+
 import pyvisa as visa
 import numpy as np
 
+# Parsed *IDN? reply; missing trailing fields are left empty
+Idn = namedtuple('Idn', ('vendor', 'model', 'serial', 'firmware'), defaults=('', '', ''))
+
 class YokogawaOSA(visa.resources.GPIBInstrument):
-    def __init__(self, visa):
-        self.idn = visa.query('*IDN?')
-        self.idn = self.idn.split(',')
-        if self.idn[0] != 'YOKOGAWA':
-            print('Device not recognized as a Yokogawa device.')
+    # :init:smode code <-> sweep mode
+    _SWEEP_MODES = {1: 'single', 2: 'repeat', 3: 'auto', 4: 'segment'}
+    _SWEEP_MODE_NUMS = {'single': 1, 'repeat': 2, 'auto': 3, 'segment': 4}
+    _TRACES = frozenset({'tra', 'trb', 'trc', 'trd', 'tre', 'trf', 'trg'})
+
+    # Expected *IDN? model field, declared by subclasses
+    _EXPECTED_MODEL = None
+
+    # Model limits, overridden by subclasses
+    min_wl = None
+    max_wl = None
+    min_span = None
+    max_span = None
+
+    # Setter templates, bound once at class creation
+    _fmt_set_wav_cent = ':sens:wav:cent {}'.format
+    _fmt_set_wav_span = ':sens:wav:span {}'.format
+
+    def __init__(self, visa, verify_idn=True, chunk_size=1 << 20):
+        # Full traces are large, so read them in big chunks
+        visa.chunk_size = chunk_size
+        visa.write_termination = '\n'
+        visa.read_termination = '\n'
+        visa.send_end = True
+        visa.timeout = 30000
+        # With <verify_idn> False the *IDN? round-trip is skipped and idn is None
+        self.idn = None
+        if verify_idn:
+            self.idn = Idn(*visa.query('*IDN?').strip().split(',', 3))
+            if self.idn.vendor != 'YOKOGAWA':
+                warnings.warn('Device not recognized as a Yokogawa device.')
+            elif self._EXPECTED_MODEL is not None and self.idn.model != self._EXPECTED_MODEL:
+                warnings.warn(f'{self.idn.vendor} device not recognized as {self._EXPECTED_MODEL}.')
         self.visa = visa
+        # Traces are transferred as binary float64 blocks
+        self.visa.write(':form:data real,64')
+
+        # Last read or written values
+        self._cache = {}
+
+    def clear_cache(self):
+        """
+        Forgets all cached values, so the next reads query the instrument,
+        e.g. after settings were changed from the front panel.
+        """
+        self._cache.clear()
+
+    def set_io_timeout(self, ms:int):
+        """
+        Sets how long a read waits for the instrument before timing out.
 
-        self.min_wl = None
-        self.max_wl = None
-        self.min_span = None
-        self.max_span = None
+        Parameters:
+            ms : int
+                Timeout in milliseconds.
+        """
+        self.visa.timeout = ms
 
     def get_wave_center(self):
         """
@@ -27,8 +79,11 @@ class YokogawaOSA(visa.resources.GPIBInstrument):
             lam : float
                 Center wavelength in meters.
         """
-        lam = self.visa.query_ascii_values(':sens:wav:cent?')[0]
-        return lam
+        try:
+            return self._cache['wav_cent']
+        except KeyError:
+            lam = self._cache['wav_cent'] = float(self.visa.query(':sens:wav:cent?'))
+            return lam
     
     def set_wave_center(self, lam:float):
         """
@@ -41,10 +96,16 @@ class YokogawaOSA(visa.resources.GPIBInstrument):
         Raises:
             ValueError: <lam> is out of range.
         """
-        if lam < self.min_wl or lam > self.max_wl:
+        lo, hi = self.min_wl, self.max_wl
+        if lo is None:
+            raise RuntimeError('Wavelength limits are not defined for this model.')
+        if not lo <= lam <= hi:
             raise ValueError(
-                f'Input parameter <lam> must be between {self.min_wl} and {self.max_wl}.')
-        self.visa.write(f':sens:wav:cent {lam}')
+                f'Input parameter <lam> must be between {lo} and {hi}.')
+        if self._cache.get('wav_cent') == lam:
+            return
+        self.visa.write(self._fmt_set_wav_cent(lam))
+        self._cache['wav_cent'] = float(lam)
     
     def get_wave_span(self):
         """
@@ -54,8 +115,11 @@ class YokogawaOSA(visa.resources.GPIBInstrument):
             span : float
                 Wavelength span in meters.
         """
-        span = self.visa.query_ascii_values(':sens:wav:span?')[0]
-        return span
+        try:
+            return self._cache['wav_span']
+        except KeyError:
+            span = self._cache['wav_span'] = float(self.visa.query(':sens:wav:span?'))
+            return span
     
     def set_wave_span(self, span:float):
         """
@@ -68,10 +132,16 @@ class YokogawaOSA(visa.resources.GPIBInstrument):
         Raises:
             ValueError: <span> is out of range.
         """
-        if span < self.min_span or span > self.max_span:
+        lo, hi = self.min_span, self.max_span
+        if lo is None:
+            raise RuntimeError('Span limits are not defined for this model.')
+        if not lo <= span <= hi:
             raise ValueError(
-                f'Input parameter <span> must be between {self.min_span} and {self.max_span}.')
-        self.visa.write(f':sens:wav:span {span}')
+                f'Input parameter <span> must be between {lo} and {hi}.')
+        if self._cache.get('wav_span') == span:
+            return
+        self.visa.write(self._fmt_set_wav_span(span))
+        self._cache['wav_span'] = float(span)
     
     def get_sweep_mode(self):
         """
@@ -80,16 +150,15 @@ class YokogawaOSA(visa.resources.GPIBInstrument):
 
         Returns:
             str: Sweep mode.
+
+        Raises:
+            KeyError: The instrument replied with an unknown sweep mode code.
         """
-        mode = self.visa.query_ascii_values(':init:smode?')[0]
-        if mode == 1:
-            return 'single'
-        elif mode == 2:
-            return 'repeat'
-        elif mode == 3:
-            return 'auto'
-        else:
-            return 'segment'
+        try:
+            return self._cache['smode']
+        except KeyError:
+            mode = self._cache['smode'] = self._SWEEP_MODES[int(self.visa.query(':init:smode?'))]
+            return mode
     
     def set_sweep_mode(self, mode:str):
         """
@@ -102,50 +171,264 @@ class YokogawaOSA(visa.resources.GPIBInstrument):
         Raises:
             ValueError: <mode> is not one of the four accepted modes
         """
-        settings = ['single', 'repeat', 'auto', 'segment']
-        if mode.lower() not in settings:
+        mode = mode.lower()
+        mode_num = self._SWEEP_MODE_NUMS.get(mode)
+        if mode_num is None:
             raise ValueError(
-                'Input paramter <mode> must be "single", "repeat", "auto", or "segment".')
-        self.visa.write(f':init:smode {mode}')
-    
+                'Input parameter <mode> must be "single", "repeat", "auto", or "segment".')
+        self.visa.write(f':init:smode {mode_num}')
+        self._cache['smode'] = mode
+
+    def configure(self, center:float=None, span:float=None, mode:str=None):
+        """
+        Sets center wavelength, span and sweep mode in one compound write.
+        Parameters left as None are not changed. All inputs are validated
+        before anything is sent, so an invalid value changes nothing.
+
+        Parameters:
+            center : float, optional
+                Center wavelength in meters.
+            span : float, optional
+                Wavelength span in meters.
+            mode : str, optional
+                Sweep mode. Either 'single', 'repeat', 'auto', or 'segment'.
+
+        Raises:
+            ValueError: An input parameter is out of range or not accepted.
+        """
+        parts = []
+        updates = {}
+        if center is not None:
+            lo, hi = self.min_wl, self.max_wl
+            if lo is None:
+                raise RuntimeError('Wavelength limits are not defined for this model.')
+            if not lo <= center <= hi:
+                raise ValueError(
+                    f'Input parameter <center> must be between {lo} and {hi}.')
+            if self._cache.get('wav_cent') != center:
+                parts.append(self._fmt_set_wav_cent(center))
+                updates['wav_cent'] = float(center)
+        if span is not None:
+            lo, hi = self.min_span, self.max_span
+            if lo is None:
+                raise RuntimeError('Span limits are not defined for this model.')
+            if not lo <= span <= hi:
+                raise ValueError(
+                    f'Input parameter <span> must be between {lo} and {hi}.')
+            if self._cache.get('wav_span') != span:
+                parts.append(self._fmt_set_wav_span(span))
+                updates['wav_span'] = float(span)
+        if mode is not None:
+            mode = mode.lower()
+            mode_num = self._SWEEP_MODE_NUMS.get(mode)
+            if mode_num is None:
+                raise ValueError(
+                    'Input parameter <mode> must be "single", "repeat", "auto", or "segment".')
+            parts.append(f':init:smode {mode_num}')
+            updates['smode'] = mode
+        if parts:
+            self.visa.write(';'.join(parts))
+            self._cache.update(updates)
+
     def run_sweep(self):
         """
         Runs a sweep. Currently requires settings to be done prior to running this.
         """
         self.visa.write(':initiate')
 
+    def get_active_trace(self):
+        """
+        Returns the name of the active trace, e.g. 'TRA'.
+        """
+        try:
+            return self._cache['trace']
+        except KeyError:
+            trace = self._cache['trace'] = self.visa.query(':trace:active?').rstrip()
+            return trace
+
+    def set_active_trace(self, trace:str):
+        """
+        Sets the active trace.
+
+        Parameters:
+            trace : str
+                One of 'tra' to 'trg'.
+
+        Raises:
+            ValueError: <trace> is not one of the seven traces.
+        """
+        if trace.lower() not in self._TRACES:
+            raise ValueError(
+                'Input parameter <trace> must be one of "tra" to "trg".')
+        self.visa.write(f':trace:active {trace}')
+        self._cache['trace'] = trace.upper()
+
+    def wait_for_sweep_complete(self, timeout=60.0, initial_interval=0.05, max_interval=0.5):
+        """
+        Blocks until the running sweep finishes, polling the operation
+        condition register with a growing interval instead of a fixed sleep.
+
+        Parameters:
+            timeout : float, optional
+                Longest time to wait, in seconds.
+            initial_interval : float, optional
+                First polling interval, in seconds.
+            max_interval : float, optional
+                Longest polling interval, in seconds.
+
+        Returns:
+            float : Seconds waited.
+
+        Raises:
+            TimeoutError: The sweep is still running after <timeout> seconds.
+        """
+        start = time.monotonic()
+        interval = initial_interval
+        while True:
+            cond = int(self.visa.query(':stat:oper:cond?'))
+            elapsed = time.monotonic() - start
+            if not cond & 1:
+                return elapsed
+            if elapsed >= timeout:
+                raise TimeoutError(
+                    f'Sweep still running after {elapsed:.1f} s (operation condition {cond}).')
+            time.sleep(min(interval, timeout - elapsed))
+            interval = min(max_interval, interval * 1.5)
+
+    def _read_active_trace(self):
+        """
+        Returns the raw reply to one compound query for the x and y data of
+        the active trace: two IEEE binary blocks separated by ';'.
+        """
+        trace = self.get_active_trace()
+
+        # Pull data from the active trace. The data format is reselected in
+        # the same message, in case a reset or the front panel restored ASCII.
+        # The reply is <x block>;<y block>, read whole with the read
+        # termination off so that binary bytes matching it do not end the
+        # read early.
+        read_termination = self.visa.read_termination
+        self.visa.read_termination = None
+        try:
+            self.visa.write(f':form:data real,64;:trace:x? {trace};:trace:y? {trace}')
+            block = self.visa.read_raw()
+        finally:
+            self.visa.read_termination = read_termination
+        return block
+
+    def _fetch_active_trace(self):
+        """
+        Returns the x and y data of the active trace.
+        """
+        block = self._read_active_trace()
+
+        # Split the reply in place: both arrays view the one received buffer
+        x_offset, x_length = visa.util.parse_ieee_block_header(block)
+        y_start = x_offset + x_length
+        y_offset, y_length = visa.util.parse_ieee_block_header(block[y_start:y_start + 32])
+        x = np.frombuffer(block, dtype='<f8', count=x_length // 8, offset=x_offset)
+        y = np.frombuffer(block, dtype='<f8', count=y_length // 8, offset=y_start + y_offset)
+
+        return x,y
+
     def single_shot(self):
         """
         Take a single shot of the on-screen data from the OSA.
 
         Returns:
-            x : array-like
+            x : ndarray
                 x data of the active trace
-            y : array-like
+            y : ndarray
                 y data of the active trace
+
+            Both arrays wrap the received float64 block without copying and
+            are read-only; no np.array() copy is needed to use them, only to
+            modify them.
         """
 
         # Stop the sweep
         self.visa.write(':abort')
 
-        # Query which trace is active
-        trace = self.visa.query_ascii_values(':trace:active?', converter='s')[0]
-        trace = trace.rstrip()
+        return self._fetch_active_trace()
 
-        # Pull data from the active trace
-        x = self.visa.query_ascii_values(f':trace:x? {trace}')
-        y = self.visa.query_ascii_values(f':trace:y? {trace}')
+    def single_shot_raw(self):
+        """
+        Like single_shot(), but returns the undecoded reply, e.g. to store it
+        or decode it later with np.frombuffer.
 
-        return x,y
+        Returns:
+            bytes : The x and y data of the active trace as two IEEE 488.2
+                    binary blocks of little-endian float64, separated by ';'.
+        """
+
+        # Stop the sweep
+        self.visa.write(':abort')
+
+        return self._read_active_trace()
+
+    def single_shot_into(self, x_out:np.ndarray, y_out:np.ndarray):
+        """
+        Like single_shot(), but copies the trace into caller-owned arrays, so
+        repeated captures reuse the same memory.
+
+        Parameters:
+            x_out : ndarray
+                Writable float64 array sized to the trace, receives the x data.
+            y_out : ndarray
+                Writable float64 array sized to the trace, receives the y data.
+
+        Returns:
+            x_out : ndarray
+            y_out : ndarray
+
+        Raises:
+            ValueError: The trace length does not match <x_out> or <y_out>.
+        """
+
+        # Stop the sweep
+        self.visa.write(':abort')
+
+        x, y = self._fetch_active_trace()
+        if x.shape != x_out.shape or y.shape != y_out.shape:
+            raise ValueError(
+                f'Output arrays must hold {x.size} points, given {x_out.size} and {y_out.size}.')
+        np.copyto(x_out, x)
+        np.copyto(y_out, y)
+        return x_out, y_out
+
+    def sweep_and_fetch(self, timeout_s=120):
+        """
+        Runs a single sweep, waits for it to finish, and returns the active
+        trace. Completion is detected with one *OPC? query instead of polling.
+        Leaves the sweep mode set to single.
+
+        Parameters:
+            timeout_s : float, optional
+                Longest time to wait for the sweep, in seconds.
+
+        Returns:
+            x : ndarray
+                x data of the active trace
+            y : ndarray
+                y data of the active trace
+
+            Both arrays wrap the received float64 block without copying and
+            are read-only; no np.array() copy is needed to use them, only to
+            modify them.
+        """
+        timeout = self.visa.timeout
+        self.visa.timeout = int(timeout_s * 1000)
+        try:
+            self.visa.query(':abort;:init:smode 1;:initiate;*OPC?')
+            self._cache['smode'] = 'single'
+        finally:
+            self.visa.timeout = timeout
+
+        return self._fetch_active_trace()
     
 class AQ6370D(YokogawaOSA):
-    def __init__(self, visa):
-        super().__init__(visa)
-        if self.idn[1] != 'AQ6370D':
-            print(f'{self.idn[0]} device not recognized as AQ6370D.')
-        self.visa = visa
-
-        self.min_wl = 600e-9
-        self.max_wl = 1700e-9
-        self.min_span = 0.1e-9
-        self.max_span = 1100e-9
\ No newline at end of file
+    min_wl = 600e-9
+    max_wl = 1700e-9
+    min_span = 0.1e-9
+    max_span = 1100e-9
+    _EXPECTED_MODEL = 'AQ6370D'
\ No newline at end of file